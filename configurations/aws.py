@@ -3,30 +3,66 @@
 Helper file to abstract AWS code configurations from scripts.
 """
 import os
+import copy
 import json
+import time
 import logging
-from time import sleep
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError, NoCredentialsError
+from configurations.cache import Cache
+from configurations.models import create_model_loader
+from configurations.scheduler import get_mutation_scheduler
 from implementation_functions.aws_implementation_functions import (
     aws_initiate_session,
+    aws_initiate_assumed_role_session,
     aws_initiate_secrets_manager_client,
     aws_initiate_lambda_client,
     aws_initiate_ecs_client,
+    aws_initiate_ec2_client,
+    aws_ec2_get_regions,
     aws_ecs_update_service,
     aws_ecs_register_task_definition,
     aws_ecs_get_services,
     aws_lambda_get_function,
     aws_secrets_manager_get_secret,
+    aws_secrets_manager_batch_get_secrets,
+    aws_secrets_manager_get_current_version,
     aws_secrets_manager_update_secret_value,
     aws_secrets_manager_create_secret,
     aws_lambda_get_layer,
     aws_lambda_publish_layer,
     aws_lambda_update_function,
     aws_ecs_get_clusters,
+    aws_ecs_describe_clusters,
     aws_ecs_is_fargate_service,
     aws_ecs_get_service_desc,
-    aws_ecs_get_fargate_defender_status
+    aws_ecs_get_service_descs,
+    aws_ecs_get_fargate_defender_status,
+    aws_ecs_list_task_definition_revisions,
+    aws_ecs_get_tags,
+    DEFENDER_SOURCE_HASH_TAG,
+    DEFENDER_VERSION_TAG,
+    ECS_MAX_ATTEMPTS
 )
 
+# Task definition revisions are immutable, so warm containers can keep reusing
+# them. Their tags are cached with them: only the sweep's own tags are read, and
+# those are set when the revision is registered.
+TASK_DEFINITION_CACHE = Cache(
+    "task-definition-descriptions",
+    max_size=int(os.environ.get("TD_CACHE_SIZE", "512")),
+    directory=os.environ.get("TD_CACHE_DIR") or None,
+)
+
+# Decoded secret values, reused by warm containers until their version changes.
+# Memory only: secrets are never written to disk.
+SECRET_CACHE = Cache("secrets", max_size=16)
+
+# Assumed-role sessions per account, reused by warm containers.
+ACCOUNT_SESSIONS = {}
+ACCOUNT_SESSIONS_LOCK = threading.Lock()
+
 
 class AWS():
     """
@@ -37,6 +73,7 @@ class AWS():
         self,
         local_run: bool,
         debug_mode=None,
+        max_pool_connections=None,
     ):
         # if local_run:
         #     self._aws_access_key_id = os.environ.get("AWS_ACCESS_KEY_ID")
@@ -51,16 +88,35 @@ class AWS():
         else:
             self._secret_name = "Prisma-Automation-Secrets"
             self._aws_region = "us-east-2"
-        
-        session = aws_initiate_session()
+        self._defender_template_secret_name = os.environ.get("DEFENDER_TEMPLATE_SECRET_NAME")
+        # seconds a cached secret is trusted before its version is checked again
+        self._secret_cache_ttl = int(os.environ.get("SECRET_CACHE_TTL", "300"))
+        self._secret_rotation_workers = max(1, int(os.environ.get("SECRET_ROTATION_WORKERS", "8")))
+        # newest revisions of a family searched for a protected revision to reuse
+        self._task_definition_index_depth = max(1, int(os.environ.get("TD_INDEX_DEPTH", "20")))
+        # empty: this region only, "all": every region enabled for the account
+        self._sweep_regions = os.environ.get("SWEEP_REGIONS", "")
+        self._max_pool_connections = max_pool_connections
+        # empty: this account only, otherwise a comma-separated list of account IDs
+        self._sweep_accounts = os.environ.get("SWEEP_ACCOUNTS", "")
+        self._sweep_role_name = os.environ.get("SWEEP_ROLE_NAME", "PrismaFargateDefenderSweep")
+        self._sweep_role_external_id = os.environ.get("SWEEP_ROLE_EXTERNAL_ID") or None
+        self._assume_role_cache_dir = os.environ.get("ASSUME_ROLE_CACHE_DIR", "/tmp/assume-role-cache")
+        self._account_id = None
+        self._accounts = {}
+
+        session = aws_initiate_session(data_loader=create_model_loader())
+        self._session = session
         self._secrets_client = aws_initiate_secrets_manager_client(
             session,
-            region=self._aws_region
-        )
-        self._ecs_client= aws_initiate_ecs_client(
-            session,
-            region=self._aws_region
+            region=self._aws_region,
+            max_pool_connections=self._secret_rotation_workers
         )
+        self._ecs_max_attempts = max(1, int(os.environ.get("ECS_MAX_ATTEMPTS", ECS_MAX_ATTEMPTS)))
+        self._ecs_client = self.initiate_ecs_client(session, self._aws_region)
+        # one pooled ECS client per region, shared by every regional view
+        self._ecs_clients = {self._aws_region: self._ecs_client}
+        self._ecs_clients_lock = threading.Lock()
 
     ################################################################################
     # region member props
@@ -75,6 +131,16 @@ class AWS():
         """
         return self._secret_name
 
+    @property
+    def defender_template_secret_name(self):
+        """
+        defender_template_secret_name member property
+
+        Returns:
+        str: defender_template_secret_name
+        """
+        return self._defender_template_secret_name
+
     @property
     def secrets_client(self):
         """
@@ -84,6 +150,36 @@ class AWS():
         AWS Secrets Manager client: secrets_client
         """
         return self._secrets_client
+
+    @property
+    def secret_cache_ttl(self):
+        """
+        secret_cache_ttl member property
+
+        Returns:
+        int: secret_cache_ttl
+        """
+        return self._secret_cache_ttl
+
+    @property
+    def secret_rotation_workers(self):
+        """
+        secret_rotation_workers member property
+
+        Returns:
+        int: secret_rotation_workers
+        """
+        return self._secret_rotation_workers
+
+    @property
+    def task_definition_index_depth(self):
+        """
+        task_definition_index_depth member property
+
+        Returns:
+        int: task_definition_index_depth
+        """
+        return self._task_definition_index_depth
     
     @property
     def lambda_client(self):
@@ -105,6 +201,46 @@ class AWS():
         """
         return self._ecs_client
 
+    @property
+    def session(self):
+        """
+        session member property
+
+        Returns:
+        boto3 Session: session
+        """
+        return self._session
+
+    @property
+    def account_id(self):
+        """
+        account_id member property, None for the Lambda's own account
+
+        Returns:
+        str: account_id
+        """
+        return self._account_id
+
+    @property
+    def sweep_accounts(self):
+        """
+        sweep_accounts member property
+
+        Returns:
+        str: sweep_accounts
+        """
+        return self._sweep_accounts
+
+    @property
+    def sweep_regions(self):
+        """
+        sweep_regions member property
+
+        Returns:
+        str: sweep_regions
+        """
+        return self._sweep_regions
+
     @property
     def aws_region(self):
         """
@@ -141,25 +277,287 @@ class AWS():
     ################################################################################
     # region member functions
     ################################################################################
-    def log_and_pause(self, msg: str, *args, **kwargs) -> None:
+    def get_prisma_secrets(self) -> dict:
         """
-        TODO: docstring
+        Get Automation Access Keys for Prisma access from Secrets Manager.
+
+        The defender template secret, when configured, is read in the same call.
         """
-        logging.info(msg, *args, **kwargs)
+        secret_names = [self.secret_name]
+        if self.defender_template_secret_name:
+            secret_names.append(self.defender_template_secret_name)
+        secrets = self.get_secret_values(
+            secret_names,
+            decoders={self.secret_name: self.decode_prisma_secrets},
+            required=[self.secret_name]
+        )
 
-        sleep(3)
+        return secrets[self.secret_name]
 
-    def get_prisma_secrets(self) -> dict:
+    def decode_prisma_secrets(self, secret_string: str) -> dict:
         """
-        Get Automation Access Keys for Prisma access from Secrets Manager.
+        Decode the Prisma access keys nested in the automation secret.
+        """
+        return json.loads(json.loads(secret_string)["AWS_SECRETS"])
+
+    def secret_cache_key(self, secret_name: str) -> str:
+        """
+        Key of a secret in SECRET_CACHE.
+        """
+        return f"{self.secrets_client.meta.region_name}|{secret_name}"
+
+    def get_secret_values(self, secret_names, decoders=None, required=()) -> dict:
+        """
+        Return decoded secret values, reusing those cached by earlier invocations.
+
+        A cached value is trusted for secret_cache_ttl seconds, then revalidated
+        with describe_secret and only read again when its AWSCURRENT version
+        changed. Secrets that must be read are fetched together.
+
+        Args:
+            secret_names (list): Secret Names
+            decoders (dict, optional): decoder per secret name, json.loads by default
+            required (list, optional): secrets whose read errors are raised
+
+        Raises:
+            ClientError: a required secret could not be read
+
+        Returns:
+            dict: decoded value per secret name, without the secrets that could not be read
+        """
+        decoders = decoders or {}
+        values = {}
+        stale = []
+        for secret_name in dict.fromkeys(secret_names):
+            entry = SECRET_CACHE.get(self.secret_cache_key(secret_name))
+            if entry is None:
+                stale.append(secret_name)
+                continue
+            if time.time() - entry["checked_at"] >= self.secret_cache_ttl:
+                if not self.is_current_secret_version(secret_name, entry["version_id"]):
+                    stale.append(secret_name)
+                    continue
+                entry["checked_at"] = time.time()
+                SECRET_CACHE.put(self.secret_cache_key(secret_name), entry)
+            values[secret_name] = entry["value"]
+        if not stale:
+            return values
+
+        responses = self.fetch_secrets(stale)
+        for secret_name in stale:
+            if secret_name in responses["secrets"]:
+                response = responses["secrets"][secret_name]
+                try:
+                    value = decoders.get(secret_name, json.loads)(response["SecretString"])
+                except (KeyError, TypeError, ValueError) as e:
+                    if secret_name in required:
+                        raise
+                    logging.info("Secret %s could not be decoded: %s", secret_name, e)
+                    continue
+                SECRET_CACHE.put(self.secret_cache_key(secret_name), {
+                    "value": value,
+                    "version_id": response.get("VersionId"),
+                    "checked_at": time.time(),
+                })
+                values[secret_name] = value
+                continue
+
+            error = responses["errors"].get(secret_name, {})
+            if secret_name in required:
+                raise ClientError(
+                    {"Error": {"Code": error.get("ErrorCode", "ResourceNotFoundException"), "Message": error.get("Message", "")}},
+                    "BatchGetSecretValue"
+                )
+            logging.info("Secret %s could not be read: %s", secret_name, error.get("Message", error.get("ErrorCode")))
+
+        return values
+
+    def is_current_secret_version(self, secret_name: str, version_id: str) -> bool:
+        """
+        Check if the version of a cached secret is still AWSCURRENT.
+        """
+        try:
+            current_version_id = aws_secrets_manager_get_current_version(
+                client=self.secrets_client, secret_name=secret_name, debug_mode=self.debug_mode)
+        except ClientError as e:
+            logging.info("Secret %s could not be revalidated: %s", secret_name, e)
+
+            return False
+
+        return version_id is not None and current_version_id == version_id
+
+    def fetch_secrets(self, secret_names: list) -> dict:
+        """
+        Read secrets with one BatchGetSecretValue call, or with GetSecretValue
+        when there is a single secret or the role may not batch.
+
+        Returns:
+            dict: secret value per name, and the error per secret that could not be read
+        """
+        if len(secret_names) > 1:
+            try:
+                return aws_secrets_manager_batch_get_secrets(
+                    client=self.secrets_client, secret_names=secret_names, debug_mode=self.debug_mode)
+            except ClientError as e:
+                if e.response['Error']['Code'] != "AccessDeniedException":
+                    raise
+                logging.info("BatchGetSecretValue denied, reading secrets one at a time.")
+
+        results = {"secrets": {}, "errors": {}}
+        for secret_name in secret_names:
+            try:
+                results["secrets"][secret_name] = aws_secrets_manager_get_secret(
+                    client=self.secrets_client, secret_name=secret_name, debug_mode=self.debug_mode)
+            except ClientError as e:
+                results["errors"][secret_name] = {"SecretId": secret_name, "ErrorCode": e.response['Error']['Code'], "Message": str(e)}
+
+        return results
+
+    def check_credentials(self) -> None:
+        """
+        Resolve this view's credentials now.
+
+        Assumed-role credentials are only fetched on the first call that needs
+        them, so a wrong role name, external ID or trust policy would otherwise
+        surface inside the first ECS call of every region.
+
+        Raises:
+            ClientError: the sweep role could not be assumed
+            NoCredentialsError: no credentials were found
+        """
+        credentials = self.session.get_credentials()
+        if credentials is None:
+            raise NoCredentialsError()
+        credentials.get_frozen_credentials()
+
+    def get_sweep_regions(self) -> list:
+        """
+        Get the regions to sweep from SWEEP_REGIONS.
+
+        Empty means this configuration's region, "all" discovers the regions
+        enabled for the account, anything else is a comma-separated list.
+        """
+        if not self.sweep_regions:
+            return [self.aws_region]
+        if self.sweep_regions.strip().lower() == "all":
+            ec2_client = aws_initiate_ec2_client(self.session, region=self.aws_region)
+
+            return aws_ec2_get_regions(client=ec2_client, debug_mode=self.debug_mode)
+
+        return [region.strip() for region in self.sweep_regions.split(",") if region.strip()]
+
+    def get_sweep_accounts(self) -> list:
+        """
+        Get the account IDs to sweep from SWEEP_ACCOUNTS, [None] for this account only.
+        """
+        accounts = [account.strip() for account in self.sweep_accounts.split(",") if account.strip()]
+
+        return accounts or [None]
+
+    def for_account(self, account_id):
+        """
+        Get a view of this configuration whose ECS calls go to another account.
+
+        The view assumes SWEEP_ROLE_NAME in the target account. Its credentials
+        are shared through ACCOUNT_SESSIONS and the assume-role file cache, and
+        refresh themselves before they expire. Secrets Manager stays in the home
+        account.
+        """
+        if account_id is None:
+            return self
+        if account_id in self._accounts:
+            return self._accounts[account_id]
+        with ACCOUNT_SESSIONS_LOCK:
+            if account_id not in ACCOUNT_SESSIONS:
+                ACCOUNT_SESSIONS[account_id] = aws_initiate_assumed_role_session(
+                    self.session,
+                    role_arn=f"arn:aws:iam::{account_id}:role/{self._sweep_role_name}",
+                    cache_dir=self._assume_role_cache_dir,
+                    external_id=self._sweep_role_external_id,
+                    data_loader=create_model_loader(),
+                )
+            session = ACCOUNT_SESSIONS[account_id]
+        account = copy.copy(self)
+        account._account_id = account_id
+        account._session = session
+        account._ecs_client = account.initiate_ecs_client(session, self.aws_region)
+        account._ecs_clients = {self.aws_region: account._ecs_client}
+        account._ecs_clients_lock = threading.Lock()
+        account._accounts = {}
+        self._accounts[account_id] = account
+
+        return account
+
+    def for_region(self, region: str):
+        """
+        Get a view of this configuration whose ECS calls go to another region.
+
+        Secrets Manager and the other clients stay in the home region.
+        """
+        if region == self.aws_region:
+            return self
+        with self._ecs_clients_lock:
+            if region not in self._ecs_clients:
+                self._ecs_clients[region] = self.initiate_ecs_client(self.session, region)
+        regional = copy.copy(self)
+        regional._aws_region = region
+        regional._ecs_client = self._ecs_clients[region]
+
+        return regional
+
+    def initiate_ecs_client(self, session, region: str):
+        """
+        Create a pooled ECS client whose mutations are paced by the account/region's scheduler.
+        """
+        client = aws_initiate_ecs_client(
+            session,
+            region=region,
+            max_pool_connections=self._max_pool_connections,
+            max_attempts=self._ecs_max_attempts
+        )
+        get_mutation_scheduler(self._account_id, region).attach(client)
+
+        return client
+
+    def get_defender_template(self, cache_key: str):
+        """
+        Get the defended template stored for the console version, if any.
         """
-        secret_response = aws_secrets_manager_get_secret(
-            client=self.secrets_client, secret_name=self.secret_name, debug_mode=self.debug_mode)
+        if not self.defender_template_secret_name:
+            return None
+        try:
+            stored = self.get_secret_values([self.defender_template_secret_name]).get(self.defender_template_secret_name)
+        except ClientError as e:
+            logging.info("Defender template secret could not be read: %s", e)
+
+            return None
 
-        prisma_keys = json.loads(json.loads(
-            secret_response['SecretString'])["AWS_SECRETS"])
+        if stored is None or stored.get("key") != cache_key:
+            return None
 
-        return prisma_keys
+        return stored["template"]
+
+    def put_defender_template(self, cache_key: str, template: dict) -> bool:
+        """
+        Store the defended template for the console version.
+        """
+        if not self.defender_template_secret_name:
+            return False
+        secret_value = json.dumps({"key": cache_key, "template": template}, default=str)
+        stored = aws_secrets_manager_update_secret_value(
+            client=self.secrets_client, secret_name=self.defender_template_secret_name, secret_value=secret_value, debug_mode=self.debug_mode)
+        if not stored:
+            stored = aws_secrets_manager_create_secret(
+                client=self.secrets_client, secret_name=self.defender_template_secret_name, secret_value=secret_value, debug_mode=self.debug_mode)
+        SECRET_CACHE.discard(self.secret_cache_key(self.defender_template_secret_name))
+
+        return stored
+
+    def open_ecs_connection(self) -> None:
+        """
+        Open the ECS connection with the cheapest read, so the first sweep call skips the TLS handshake.
+        """
+        self.ecs_client.list_clusters(maxResults=1)
 
     def get_ecs_clusters(self) -> list:
         """
@@ -170,6 +568,15 @@ class AWS():
 
         return response
 
+    def describe_ecs_clusters(self, cluster_arns) -> dict:
+        """
+        Describe ECS clusters with their statistics, 100 per describe call.
+        """
+        response = aws_ecs_describe_clusters(
+            cluster_arns, client=self.ecs_client, debug_mode=self.debug_mode)
+
+        return response
+
     def get_cluster_services(self, cluster_name) -> list:
         """
         Get Automation Access Keys for Prisma access from Secrets Manager.
@@ -179,6 +586,22 @@ class AWS():
 
         return response
     
+    def get_cluster_fargate_services(self, cluster_name, capacity_provider_pass=True) -> list:
+        """
+        Get the services of a cluster that may run on Fargate.
+
+        Services on a capacity provider strategy have no launch type, so the
+        launchType filter cannot find them. Clusters that may have them are
+        listed once, unfiltered, and their EC2 and EXTERNAL services are dropped
+        when the services are described. Every other cluster is listed with the
+        FARGATE filter only.
+        """
+        if capacity_provider_pass:
+            return aws_ecs_get_services(cluster_name, client=self.ecs_client, debug_mode=self.debug_mode)
+
+        return aws_ecs_get_services(
+            cluster_name, client=self.ecs_client, debug_mode=self.debug_mode, launch_type="FARGATE")
+
     def get_service_desc(self, service_arn, cluster_name):
         """
         Get Service Description for a given ECS service
@@ -187,6 +610,14 @@ class AWS():
         
         return response
 
+    def get_service_descs(self, service_arns, cluster_name) -> dict:
+        """
+        Get Service Descriptions for many ECS services, 10 per describe call
+        """
+        response = aws_ecs_get_service_descs(service_arns, cluster_name, client=self.ecs_client, debug_mode=self.debug_mode)
+
+        return response
+
     def is_fargate_service(self, service_desc):
         """
         Get Automation Access Keys for Prisma access from Secrets Manager.
@@ -198,26 +629,63 @@ class AWS():
 
     def get_fargate_defender_status(self, latest_version, task_definition_arn):
         """
-        Get Automation Access Keys for Prisma access from Secrets Manager.
+        Get the task definition and its defender status, reusing cached revisions.
         """
         task_definition, response = aws_ecs_get_fargate_defender_status(
-            latest_version, task_definition_arn, client=self.ecs_client, debug_mode=self.debug_mode)
+            latest_version, task_definition_arn, client=self.ecs_client, debug_mode=self.debug_mode, cache=TASK_DEFINITION_CACHE)
 
         return task_definition, response
     
-    def register_task_definition(self, task_definition) -> str:
+    def register_task_definition(self, task_definition, source_hash=None, defender_version=None) -> str:
         """
-        Get Automation Access Keys for Prisma access from Secrets Manager.
+        Register a task definition revision, tagged with the protection it carries.
+
+        Raises:
+            ClientError: ECS kept throttling the request
+
+        Returns:
+            str: ARN of the revision, or None when it could not be registered
         """
+        tags = None
+        if source_hash is not None:
+            tags = {DEFENDER_SOURCE_HASH_TAG: source_hash, DEFENDER_VERSION_TAG: defender_version}
         response = aws_ecs_register_task_definition(
-            task_definition, client=self.ecs_client, debug_mode=self.debug_mode)
+            task_definition, client=self.ecs_client, debug_mode=self.debug_mode, tags=tags)
 
         return response
-    
+
+    def list_task_definition_revisions(self, family: str) -> list:
+        """
+        List the newest TD_INDEX_DEPTH active revisions of a family, newest first.
+        """
+        return aws_ecs_list_task_definition_revisions(
+            family, client=self.ecs_client, debug_mode=self.debug_mode, limit=self._task_definition_index_depth)
+
+    def get_revision_source_hash(self, revision_arn: str):
+        """
+        Read the source hash a protected revision was tagged with.
+
+        Returns:
+            str: source hash, or None for revisions the sweep did not register
+        """
+        tags = aws_ecs_get_tags(revision_arn, client=self.ecs_client, debug_mode=self.debug_mode)
+
+        return (tags or {}).get(DEFENDER_SOURCE_HASH_TAG)
+
     def update_service(self, cluster_name, service_name, task_definition) -> dict:
         """
-        Get Automation Access Keys for Prisma access from Secrets Manager.
+        Point a service at a task definition revision.
+
+        Raises:
+            ClientError: ECS kept throttling the request
+
+        Returns:
+            dict: update_service response, or None when the service was not updated
         """
+        if task_definition is None:
+            logging.info("Service %s was not updated: no task definition to roll out.", service_name)
+
+            return None
         response = aws_ecs_update_service(
             cluster_name, service_name, task_definition, client=self.ecs_client, debug_mode=self.debug_mode)
 
@@ -265,6 +733,7 @@ class AWS():
         """
         rotated = aws_secrets_manager_update_secret_value(
             client=self.secrets_client, secret_name=secret_name, secret_value=secret_value, debug_mode=self.debug_mode)
+        SECRET_CACHE.discard(self.secret_cache_key(secret_name))
 
         if rotated:
             logging.info("Secret sucessfully rotated!")
@@ -277,38 +746,64 @@ class AWS():
         """
         created = aws_secrets_manager_create_secret(
             client=self.secrets_client, secret_name=secret_name, secret_value=secret_value, debug_mode=self.debug_mode)
+        SECRET_CACHE.discard(self.secret_cache_key(secret_name))
 
         if created:
             logging.info("Secret successfully created!")
 
         return created
 
-    def rotate_keys(self, access_keys: list[dict]) -> None:
+    def rotate_key(self, access_key: dict) -> bool:
         """
-        TODO: docstring
+        Store one key, creating its secret if it does not exist yet.
 
         Args:
-            access_keys (list[dict]): _description_
+            access_key (dict): secret name and value
+
+        Returns:
+            bool: whether the key was stored
         """
-        self.log_and_pause(
-            "Rotating %s keys from Prisma in AWS...", len(access_keys))
+        rotated = self.rotate_secret(
+            secret_name=access_key["name"], secret_value=access_key["value"])
 
-        for access_key in access_keys:
-            rotated = self.rotate_secret(
+        if not rotated:
+            logging.info(
+                "Secret doesn't exist in AWS yet, creating it now.")
+            created = self.create_secret(
                 secret_name=access_key["name"], secret_value=access_key["value"])
 
-            if not rotated:
+            if not created:
                 logging.info(
-                    "Secret doesn't exist in AWS yet, creating it now.")
-                created = self.create_secret(
-                    secret_name=access_key["name"], secret_value=access_key["value"])
+                    "Issue creating secret in AWS for `%s`...", access_key["name"])
 
-                if not created:
-                    logging.info(
-                        "Issue creating secret in AWS for `%s`...", access_key["name"])
-                continue
+            return created
+
+        return rotated
+
+    def rotate_keys(self, access_keys: list[dict]) -> dict:
+        """
+        Store the keys in Secrets Manager concurrently.
+
+        The secrets client retries in adaptive mode, so throttling slows the
+        workers down instead of failing the rotation.
+
+        Args:
+            access_keys (list[dict]): secret name and value per key
+
+        Returns:
+            dict: whether each secret name was stored
+        """
+        logging.info(
+            "Rotating %s keys from Prisma in AWS...", len(access_keys))
+
+        with ThreadPoolExecutor(max_workers=self.secret_rotation_workers) as pool:
+            results = dict(zip(
+                (access_key["name"] for access_key in access_keys),
+                pool.map(self.rotate_key, access_keys)
+            ))
+        logging.info("Rotated %s of %s keys.", sum(results.values()), len(results))
 
-            continue
+        return results
     ################################################################################
     # endregion member functions
     ################################################################################
@@ -0,0 +1,180 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract caching from scripts.
+
+Caches are created at module scope so that warm Lambda containers keep them
+between invocations. An optional directory (normally under /tmp) adds a disk
+layer that survives the in-memory LRU eviction.
+"""
+import os
+import copy
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+class Cache():
+    """
+    This class contains a thread-safe LRU cache with an optional JSON disk layer.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size=256,
+        directory=None,
+    ):
+        self._namespace = namespace
+        self._max_size = max(1, int(max_size))
+        self._directory = os.path.join(directory, namespace) if directory else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def namespace(self):
+        """
+        namespace member property
+
+        Returns:
+        str: namespace
+        """
+        return self._namespace
+
+    @property
+    def directory(self):
+        """
+        directory member property
+
+        Returns:
+        str: directory
+        """
+        return self._directory
+
+    @property
+    def stats(self):
+        """
+        stats member property
+
+        Returns:
+        dict: stats
+        """
+        return {"size": len(self._entries), "hits": self._hits, "misses": self._misses}
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def get(self, key: str):
+        """
+        Return a copy of the cached value, or None on a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+
+                return copy.deepcopy(self._entries[key])
+
+        value = self.read_file(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+
+                return None
+            self._hits += 1
+            self.store(key, value)
+
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value) -> None:
+        """
+        Cache a copy of the value in memory and, if enabled, on disk.
+        """
+        value = copy.deepcopy(value)
+        with self._lock:
+            self.store(key, value)
+        self.write_file(key, value)
+
+    def discard(self, key: str) -> None:
+        """
+        Drop one entry from memory and, if enabled, from disk.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._directory:
+            try:
+                os.remove(self.file_path(key))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """
+        Drop the in-memory entries. The disk layer is left in place.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def store(self, key: str, value) -> None:
+        """
+        Insert into the in-memory LRU. Callers must hold the lock.
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def file_path(self, key: str) -> str:
+        """
+        Map a cache key to its file in the disk layer.
+        """
+        return os.path.join(self._directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def read_file(self, key: str):
+        """
+        Read a value from the disk layer.
+        """
+        if not self._directory:
+            return None
+        path = self.file_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return entry["value"] if entry.get("key") == key else None
+
+    def write_file(self, key: str, value) -> None:
+        """
+        Write a value to the disk layer, evicting the least recently used files.
+        """
+        if not self._directory:
+            return
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            path = self.file_path(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump({"key": key, "value": value}, file, default=str)
+            os.replace(temp_path, path)
+
+            files = [os.path.join(self._directory, f) for f in os.listdir(self._directory) if f.endswith(".json")]
+            if len(files) > self._max_size:
+                files.sort(key=os.path.getmtime)
+                for old_file in files[:len(files) - self._max_size]:
+                    os.remove(old_file)
+        except OSError as e:
+            logging.info("Could not write %s cache entry to disk: %s", self._namespace, e)
+    ################################################################################
+    # endregion member functions
+    ################################################################################
@@ -6,12 +6,15 @@ import os
 import ast
 import sys
 import glob
-from dotenv import load_dotenv
 from pathlib import Path
 import logging
-import logging.handlers
+from configurations.imports import lazy_import
+from configurations.sweep import SWEEP_STAGES
 import datetime as dt
 
+# only needed when log files are generated
+logging_handlers = lazy_import("logging.handlers")
+
 
 class Configurations:
     """
@@ -39,6 +42,19 @@ class Configurations:
             self._debug_mode = True
             self._generate_log_files = False
             self._log_file_limit = 1
+        self._sweep_max_workers = int(os.environ.get("SWEEP_MAX_WORKERS", "8"))
+        self._sweep_state_path = os.environ.get(
+            "SWEEP_STATE_PATH", "/tmp/fargate-defender-sweep-state.json")
+        self._sweep_state_max_age = int(os.environ.get("SWEEP_STATE_MAX_AGE", "86400"))
+        self._sweep_max_regions = int(os.environ.get("SWEEP_MAX_REGIONS", "4"))
+        self._sweep_skip_non_fargate_clusters = ast.literal_eval(
+            os.environ.get("SWEEP_SKIP_NON_FARGATE_CLUSTERS", "False"))
+        # e.g. "protect=4,rollout=2", stages not listed use the sweep's defaults
+        self._sweep_stage_workers = parse_stage_workers(os.environ.get("SWEEP_STAGE_WORKERS", ""))
+        self._sweep_queue_size = int(os.environ.get("SWEEP_QUEUE_SIZE", "0"))
+        # with type "aws" and no credential, images Prisma has not scanned use their registry's credential
+        self._sweep_registry_type = os.environ.get("SWEEP_REGISTRY_TYPE", "")
+        self._sweep_registry_credential_id = os.environ.get("SWEEP_REGISTRY_CREDENTIAL_ID", "")
         self._utc_time = dt.datetime.now(dt.timezone.utc)
         self._timestamp = str(self._utc_time).split()[1]
         self._datestamp = str(self._utc_time).split()[0]
@@ -67,6 +83,96 @@ class Configurations:
         """
         return self._log_file_limit
 
+    @property
+    def sweep_max_workers(self):
+        """
+        sweep_max_workers member property
+
+        Returns:
+        int: sweep_max_workers
+        """
+        return self._sweep_max_workers
+
+    @property
+    def sweep_state_path(self):
+        """
+        sweep_state_path member property, empty to check every service each run
+
+        Returns:
+        str: sweep_state_path
+        """
+        return self._sweep_state_path
+
+    @property
+    def sweep_state_max_age(self):
+        """
+        sweep_state_max_age member property
+
+        Returns:
+        int: sweep_state_max_age
+        """
+        return self._sweep_state_max_age
+
+    @property
+    def sweep_max_regions(self):
+        """
+        sweep_max_regions member property, the number of account/region sweeps run at once
+
+        Returns:
+        int: sweep_max_regions
+        """
+        return self._sweep_max_regions
+
+    @property
+    def sweep_skip_non_fargate_clusters(self):
+        """
+        sweep_skip_non_fargate_clusters member property
+
+        Returns:
+        bool: sweep_skip_non_fargate_clusters
+        """
+        return self._sweep_skip_non_fargate_clusters
+
+    @property
+    def sweep_stage_workers(self):
+        """
+        sweep_stage_workers member property, workers per pipeline stage
+
+        Returns:
+        dict: sweep_stage_workers
+        """
+        return self._sweep_stage_workers
+
+    @property
+    def sweep_queue_size(self):
+        """
+        sweep_queue_size member property, 0 for the sweep's default
+
+        Returns:
+        int: sweep_queue_size
+        """
+        return self._sweep_queue_size
+
+    @property
+    def sweep_registry_type(self):
+        """
+        sweep_registry_type member property
+
+        Returns:
+        str: sweep_registry_type
+        """
+        return self._sweep_registry_type
+
+    @property
+    def sweep_registry_credential_id(self):
+        """
+        sweep_registry_credential_id member property
+
+        Returns:
+        str: sweep_registry_credential_id
+        """
+        return self._sweep_registry_credential_id
+
     @property
     def utc_time(self):
         """
@@ -181,6 +287,14 @@ class Configurations:
     # region member functions
     ################################################################################
 
+    def start_run(self) -> None:
+        """
+        Refresh the run timestamps when the configuration is reused by a warm container.
+        """
+        self._utc_time = dt.datetime.now(dt.timezone.utc)
+        self._timestamp = str(self._utc_time).split()[1]
+        self._datestamp = str(self._utc_time).split()[0]
+
     def get_process_info(self) -> dict:
         """
         Returns important code configurations and properties
@@ -230,7 +344,7 @@ class Configurations:
         if not os.path.exists(file_path):
             open(file_path, mode, encoding=encoding)
 
-        handler = logging.handlers.RotatingFileHandler(
+        handler = logging_handlers.RotatingFileHandler(
             filename=file_path,
             mode=mode,
             encoding=encoding
@@ -292,3 +406,31 @@ class Configurations:
     ################################################################################
     # endregion member functions
     ################################################################################
+
+
+def parse_stage_workers(value: str) -> dict:
+    """
+    Parse SWEEP_STAGE_WORKERS, a comma-separated list of stage=workers.
+
+    Raises:
+        ValueError: an item is malformed, names an unknown stage or has fewer than 1 worker
+
+    Returns:
+        dict: workers per stage
+    """
+    stage_workers = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        stage, _, workers = item.partition("=")
+        stage = stage.strip()
+        if stage not in SWEEP_STAGES:
+            raise ValueError(f"SWEEP_STAGE_WORKERS: unknown stage {stage!r} in {item.strip()!r}, expected one of {', '.join(SWEEP_STAGES)}")
+        try:
+            stage_workers[stage] = int(workers)
+        except ValueError:
+            raise ValueError(f"SWEEP_STAGE_WORKERS: workers of {stage} must be an integer, got {workers.strip()!r}") from None
+        if stage_workers[stage] < 1:
+            raise ValueError(f"SWEEP_STAGE_WORKERS: {stage} needs at least 1 worker, got {stage_workers[stage]}")
+
+    return stage_workers
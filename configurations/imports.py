@@ -0,0 +1,224 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract import handling from scripts.
+
+boto3 and requests dominate the cold start, so modules that only need them on
+some paths import them through `lazy_import`. With IMPORT_PROFILE=True the
+entry point records what every import costs, like `python -X importtime`, and
+writes the slowest modules to the log.
+"""
+import os
+import ast
+import sys
+import time
+import logging
+import importlib
+import threading
+
+
+class LazyModule():
+    """
+    This class stands in for a module and imports it on first attribute access.
+    """
+
+    def __init__(
+        self,
+        name: str,
+    ):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}' ({'imported' if self._module is not None else 'not imported'})>"
+
+
+class TimedLoader():
+    """
+    This class wraps a module loader and reports how long the module took to execute.
+    """
+
+    def __init__(
+        self,
+        loader,
+        profiler,
+    ):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, attribute):
+        return getattr(self._loader, attribute)
+
+    def create_module(self, spec):
+        """
+        Delegate module creation to the wrapped loader.
+        """
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        """
+        Execute the module through the wrapped loader and time it.
+        """
+        self._profiler.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.leave(module.__name__)
+
+
+class ImportProfiler():
+    """
+    This class is a meta path finder that times each module as it is imported.
+
+    Self time excludes the modules imported while the module executed,
+    cumulative time includes them.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._reported = 0
+        self._local = threading.local()
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def entries(self):
+        """
+        entries member property
+
+        Returns:
+        list: (module, self seconds, cumulative seconds), in import order
+        """
+        return self._entries
+
+    @property
+    def active(self):
+        """
+        active member property
+
+        Returns:
+        bool: active
+        """
+        return self in sys.meta_path
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def start(self) -> None:
+        """
+        Start timing imports.
+        """
+        if not self.active:
+            sys.meta_path.insert(0, self)
+
+    def stop(self) -> None:
+        """
+        Stop timing imports. Modules imported so far stay in the entries.
+        """
+        if self.active:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        """
+        Find the module with the remaining finders and wrap its loader.
+        """
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = TimedLoader(spec.loader, self)
+                    return spec
+        finally:
+            self._local.finding = False
+
+        return None
+
+    def enter(self) -> None:
+        """
+        Start timing a module on this thread.
+        """
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        # [start, time spent in nested imports]
+        self._local.stack.append([time.perf_counter(), 0.0])
+
+    def leave(self, name: str) -> None:
+        """
+        Record the module timed by the matching enter call.
+        """
+        start, nested = self._local.stack.pop()
+        cumulative = time.perf_counter() - start
+        if self._local.stack:
+            self._local.stack[-1][1] += cumulative
+        self._entries.append((name, cumulative - nested, cumulative))
+
+    def log_report(self, limit=25) -> None:
+        """
+        Log the slowest modules imported since the last report.
+        """
+        entries = self._entries[self._reported:]
+        self._reported += len(entries)
+        if not entries:
+            return
+        total = sum(self_time for _, self_time, _ in entries)
+        logging.info("Import profile: %s modules imported in %.1f ms, slowest %s:", len(entries), total * 1000, min(limit, len(entries)))
+        logging.info("import time: self [us] | cumulative | imported package")
+        for name, self_time, cumulative in sorted(entries, key=lambda entry: entry[2], reverse=True)[:limit]:
+            logging.info("import time: %9d | %10d | %s", self_time * 1000000, cumulative * 1000000, name)
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+IMPORT_PROFILER = ImportProfiler()
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Return a stand-in that imports the module the first time it is used.
+
+    A module that was already imported elsewhere is bound at once.
+
+    Args:
+        name (str): module name
+
+    Returns:
+        LazyModule: stand-in for the module
+    """
+    module = LazyModule(name)
+    if name in sys.modules:
+        getattr(module, "__name__")
+
+    return module
+
+
+def start_import_profile() -> bool:
+    """
+    Start the import profiler when IMPORT_PROFILE is set.
+
+    Returns:
+        bool: whether imports are being profiled
+    """
+    if not ast.literal_eval(os.environ.get("IMPORT_PROFILE", "False")):
+        return False
+    IMPORT_PROFILER.start()
+
+    return True
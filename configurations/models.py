@@ -0,0 +1,290 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract botocore model loading from scripts.
+
+The stock loader gunzips and parses every model a client needs on each cold
+start, and walks the whole botocore data directory to list services. The
+restricted loader only knows the services this package calls and can serve
+their models from a marshal snapshot built at packaging time:
+
+    python -m configurations.models
+
+The snapshot is ignored when the checksum of its source files (and the
+botocore and Python versions) no longer matches.
+"""
+import os
+import sys
+import marshal
+import hashlib
+import logging
+import threading
+import botocore
+from botocore.exceptions import DataNotFoundError, UnknownServiceError
+from botocore.loaders import Loader, instance_cache
+
+# services whose clients this package creates
+MODEL_SERVICES = tuple(
+    service.strip() for service in os.environ.get("BOTOCORE_MODEL_SERVICES", "ecs,secretsmanager,lambda,sts,ec2").split(",") if service.strip()
+)
+MODEL_SNAPSHOT_PATH = os.environ.get(
+    "BOTOCORE_MODEL_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "botocore-models.marshal"),
+)
+# model types loaded when a client is created or paginates
+MODEL_TYPES = ("service-2", "endpoint-rule-set-1", "paginators-1", "waiters-2")
+# shared data files loaded by every session
+SHARED_DATA = ("endpoints", "partitions", "_retry", "sdk-default-configuration")
+
+
+class SnapshotLoader(Loader):
+    """
+    This class is a botocore loader restricted to a fixed set of services.
+
+    Only the builtin data directory is searched. Lookups are answered from the
+    snapshot first. With record set, misses are added to it so a snapshot can
+    be written after the models were loaded from their JSON files. Each data
+    file is marshalled on its own and decoded once per loader, when it is first
+    requested.
+    """
+
+    def __init__(
+        self,
+        services,
+        snapshot=None,
+        record=False,
+    ):
+        super().__init__(
+            extra_search_paths=[Loader.BUILTIN_DATA_PATH],
+            include_default_search_paths=False,
+        )
+        self._services = tuple(sorted(set(services)))
+        snapshot = snapshot or {}
+        self._versions = snapshot.get("versions", {})
+        self._data = snapshot.get("data", {})
+        self._record = record
+        self._lock = threading.Lock()
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def services(self):
+        """
+        services member property
+
+        Returns:
+        tuple: services
+        """
+        return self._services
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    @instance_cache
+    def list_available_services(self, type_name):
+        """
+        List the restricted services that have a model of the type.
+        """
+        services = []
+        for service_name in self._services:
+            try:
+                self.list_api_versions(service_name, type_name)
+            except DataNotFoundError:
+                continue
+            services.append(service_name)
+
+        return services
+
+    @instance_cache
+    def list_api_versions(self, service_name, type_name):
+        """
+        List the API versions of a restricted service, without scanning unrelated services.
+        """
+        if service_name not in self._services:
+            raise UnknownServiceError(service_name=service_name, known_service_names=", ".join(self._services))
+        key = (service_name, type_name)
+        if key not in self._versions:
+            try:
+                versions = super().list_api_versions(service_name, type_name)
+            except DataNotFoundError:
+                versions = None
+            with self._lock:
+                self._versions[key] = tuple(versions) if versions else None
+        if self._versions[key] is None:
+            raise DataNotFoundError(data_path=service_name)
+
+        return list(self._versions[key])
+
+    @instance_cache
+    def load_data_with_path(self, name):
+        """
+        Load data from the snapshot, falling back to the JSON files.
+        """
+        if name not in self._data:
+            if not self._record:
+                return super().load_data_with_path(name)
+            try:
+                data, path = super().load_data_with_path(name)
+            except DataNotFoundError:
+                data, path = None, None
+            # recorded before the extras are merged into it, and kept marshalled
+            # so a snapshot only decodes the models a client asks for
+            with self._lock:
+                self._data[name] = (marshal.dumps(to_builtin(data)) if data is not None else None, path)
+            if data is None:
+                raise DataNotFoundError(data_path=name)
+
+            return data, path
+
+        data, path = self._data[name]
+        if data is None:
+            raise DataNotFoundError(data_path=name)
+
+        return marshal.loads(data), path
+
+    def snapshot(self) -> dict:
+        """
+        Return everything loaded so far, with the checksum of its source files.
+        """
+        with self._lock:
+            data = dict(self._data)
+            versions = dict(self._versions)
+
+        return {
+            "checksum": snapshot_checksum(path for _, path in data.values()),
+            "versions": versions,
+            "data": data,
+        }
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def to_builtin(value):
+    """
+    Copy loaded JSON into plain dicts and lists, which marshal can write.
+    """
+    if isinstance(value, dict):
+        return {key: to_builtin(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_builtin(item) for item in value]
+
+    return value
+
+
+def source_path(path: str):
+    """
+    Return the file a data path was loaded from.
+    """
+    for extension in (".json", ".json.gz"):
+        if os.path.isfile(path + extension):
+            return path + extension
+
+    return None
+
+
+def snapshot_checksum(paths) -> str:
+    """
+    Hash the source files of a snapshot with the botocore and Python versions.
+    """
+    checksum = hashlib.sha256(f"{botocore.__version__}|{sys.version}".encode("utf-8"))
+    for path in sorted(path for path in paths if path):
+        file_path = source_path(path)
+        checksum.update(path.encode("utf-8"))
+        if file_path is None:
+            continue
+        with open(file_path, "rb") as file:
+            checksum.update(file.read())
+
+    return checksum.hexdigest()
+
+
+def read_model_snapshot(path: str):
+    """
+    Read a model snapshot, or return None if it is missing or out of date.
+    """
+    try:
+        with open(path, "rb") as file:
+            snapshot = marshal.loads(file.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        logging.info("Botocore model snapshot at %s could not be read: %s", path, e)
+
+        return None
+
+    try:
+        checksum = snapshot_checksum(path for _, path in snapshot["data"].values())
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        logging.info("Botocore model snapshot at %s could not be validated: %s", path, e)
+
+        return None
+    if checksum != snapshot.get("checksum"):
+        logging.info("Botocore model snapshot at %s is out of date, loading models from botocore.", path)
+
+        return None
+
+    return snapshot
+
+
+def write_model_snapshot(loader: SnapshotLoader, path: str) -> None:
+    """
+    Atomically write the models loaded by the loader to the path.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        marshal.dump(loader.snapshot(), file)
+    os.replace(temp_path, path)
+
+
+def create_model_loader():
+    """
+    Create a restricted loader for one botocore session.
+
+    Each session gets its own loader (boto3 appends to the loader's search path),
+    but they share the snapshot, which is read once per container.
+
+    Returns:
+        SnapshotLoader: loader, or None when BOTOCORE_MODEL_SERVICES is empty
+    """
+    global _snapshot  # pylint: disable=global-statement
+    if not MODEL_SERVICES:
+        return None
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = read_model_snapshot(MODEL_SNAPSHOT_PATH) or {}
+
+    return SnapshotLoader(MODEL_SERVICES, snapshot=_snapshot)
+
+
+def build_model_snapshot(path: str = MODEL_SNAPSHOT_PATH) -> dict:
+    """
+    Load every model type of the restricted services and write the snapshot.
+
+    Returns:
+        dict: number of services and data files in the snapshot
+    """
+    loader = SnapshotLoader(MODEL_SERVICES, record=True)
+    for name in SHARED_DATA:
+        loader.load_data(name)
+    for service_name in MODEL_SERVICES:
+        for type_name in MODEL_TYPES:
+            try:
+                loader.load_service_model(service_name, type_name)
+            except DataNotFoundError:
+                continue
+    write_model_snapshot(loader, path)
+
+    return {"services": len(MODEL_SERVICES), "files": len(loader.snapshot()["data"])}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.info("Botocore model snapshot written to %s: %s", MODEL_SNAPSHOT_PATH, build_model_snapshot())
@@ -6,19 +6,43 @@ import os
 import ast
 import json
 import logging
+import hashlib
 import datetime
+import threading
 from typing import Tuple, Any
-from time import sleep
+from configurations.cache import Cache
+from configurations.tokens import TOKEN_MANAGER
+from configurations.renderer import ProtectedTaskRenderer
 from implementation_functions.prisma_implementation_functions import (
     prisma_cspm_login,
     prisma_cwp_login,
     prisma_get_expired_serverless_defenders,
     prisma_get_serverless_defender_zip,
-    prisma_check_image_in_registry,
+    prisma_get_registry,
+    prisma_normalize_image,
+    prisma_registry_image_keys,
     prisma_generate_protected_task,
     prisma_get_latest_version
 )
 
+# Prisma's output only depends on the task definition, the fargate params and the
+# console version, so identical inputs can skip the round trip.
+PROTECTED_TASK_CACHE = Cache(
+    "protected-tasks",
+    max_size=int(os.environ.get("PROTECTED_TASK_CACHE_SIZE", "256")),
+    directory=os.environ.get("PROTECTED_TASK_CACHE_DIR") or None,
+)
+
+# token refreshes tried before a request that keeps returning 401 is given up
+PRISMA_UNAUTHORIZED_RETRIES = 2
+
+# The defended template only changes with the console version.
+DEFENDER_TEMPLATE_CACHE = Cache(
+    "defender-templates",
+    max_size=8,
+    directory=os.environ.get("DEFENDER_TEMPLATE_CACHE_DIR") or None,
+)
+
 
 class Prisma():
     """
@@ -71,6 +95,14 @@ class Prisma():
         self._debug_mode = debug_mode
         self._request_offset = request_offset
         self._request_limit = request_limit
+        self._registry_index = None
+        self._registry_index_error = None
+        self._defender_template = None
+        self._protected_task_renderer = None
+        self._protected_task_renderer_key = None
+        # render protected tasks from the defender template instead of asking Prisma per service
+        self._local_task_rendering = ast.literal_eval(os.environ.get("LOCAL_TASK_RENDERING", "True"))
+        self._registry_index_lock = threading.Lock()
     ################################################################################
     # region member props
     ################################################################################
@@ -131,6 +163,26 @@ class Prisma():
     def updated_fargate_image(self, updated_fargate_image):
         self._updated_fargate_image = updated_fargate_image
 
+    @property
+    def defender_template(self):
+        """
+        defender_template member property
+
+        Returns:
+        dict: defended version of the default task definition
+        """
+        return self._defender_template
+
+    @property
+    def protected_task_renderer(self):
+        """
+        protected_task_renderer member property
+
+        Returns:
+        ProtectedTaskRenderer: renderer learned from the defender template, or None
+        """
+        return self._protected_task_renderer
+
     @property
     def prisma_access_key(self):
         """
@@ -204,11 +256,14 @@ class Prisma():
     @property
     def cspm_token(self):
         """
-        cspm_token member property
+        cspm_token member property, logged in on first use and refreshed ahead of its expiry
 
         Returns:
         bool: cspm_token
         """
+        if self._cspm_token is None or not TOKEN_MANAGER.is_fresh(self.token_key("cspm"), self._cspm_token):
+            self.get_cspm_token()
+
         return self._cspm_token
 
     @cspm_token.setter
@@ -232,11 +287,14 @@ class Prisma():
     @property
     def cwp_token(self):
         """
-        cwp_token member property
+        cwp_token member property, logged in on first use and refreshed ahead of its expiry
 
         Returns:
         bool: cwp_token
         """
+        if self._cwp_token is None or not TOKEN_MANAGER.is_fresh(self.token_key("cwp"), self._cwp_token):
+            self.get_cwp_token()
+
         return self._cwp_token
 
     @cwp_token.setter
@@ -246,11 +304,14 @@ class Prisma():
     @property
     def tenant_id(self):
         """
-        tenant_id member property
+        tenant_id member property, read from the CSPM login on first use
 
         Returns:
         bool: tenant_id
         """
+        if self._tenant_id is None:
+            self.get_cspm_token()
+
         return self._tenant_id
 
     @tenant_id.setter
@@ -277,13 +338,12 @@ class Prisma():
     ################################################################################
     # region member functions
     ################################################################################
-    def log_and_pause(self, msg: str, *args, **kwargs) -> None:
+    def start_run(self):
         """
-        TODO: docstring
+        forget the per-run state when the configuration is reused by a warm container
         """
-        logging.info(msg, *args, **kwargs)
-
-        sleep(3)
+        self._registry_index = None
+        self._registry_index_error = None
 
     def send_api_request(self, prisma_api: Tuple[Any, int]) -> Tuple[Any, int]:
         """
@@ -319,40 +379,71 @@ class Prisma():
 
                 return response, status_code
 
-    def get_cspm_token(self):
+    def token_key(self, realm: str) -> tuple:
         """
-        refresh the member token property
+        key of this realm's token in the shared token manager
         """
-        response = prisma_cspm_login(
-            access_key=self._prisma_access_key,
-            secret_key=self._prisma_secret_key,
-            cspm_endpoint=self._cspm_endpoint,
-            debug_mode=self._debug_mode,
-        )
+        endpoint = self._cspm_endpoint if realm == "cspm" else self._cwp_endpoint
 
-        self.cspm_token = response[0]["token"]
-        self.tenant_id = response[0]["customerNames"][0]["prismaId"]
+        return (realm, endpoint, self._prisma_access_key)
 
-    def get_cwp_token(self):
+    def get_cspm_token(self, rejected=None):
         """
         refresh the member token property
+
+        Warm containers reuse the cached login until it is close to expiry.
+
+        Args:
+            rejected (str, optional): token a request was just refused with; a
+                login is only made if it is still the cached token
+        """
+        def login():
+            response = prisma_cspm_login(
+                access_key=self._prisma_access_key,
+                secret_key=self._prisma_secret_key,
+                cspm_endpoint=self._cspm_endpoint,
+                debug_mode=self._debug_mode,
+            )
+
+            return response[0]
+
+        response = TOKEN_MANAGER.get_login(self.token_key("cspm"), login, stale_token=rejected)
+
+        self.cspm_token = response["token"]
+        self.tenant_id = response["customerNames"][0]["prismaId"]
+
+    def get_cwp_token(self, rejected=None):
         """
-        response = prisma_cwp_login(
-            access_key=self._prisma_access_key,
-            secret_key=self._prisma_secret_key,
-            cwp_endpoint=self._cwp_endpoint,
-            debug_mode=self._debug_mode,
-        )
+        refresh the member token property
+
+        Warm containers reuse the cached login until it is close to expiry.
+
+        Args:
+            rejected (str, optional): token a request was just refused with; a
+                login is only made if it is still the cached token
+        """
+        def login():
+            response = prisma_cwp_login(
+                access_key=self._prisma_access_key,
+                secret_key=self._prisma_secret_key,
+                cwp_endpoint=self._cwp_endpoint,
+                debug_mode=self._debug_mode,
+            )
+
+            return response[0]
+
+        response = TOKEN_MANAGER.get_login(self.token_key("cwp"), login, stale_token=rejected)
+
+        self._cwp_token = response["token"]
 
-        self._cwp_token = response[0]["token"]
-    
     def get_expired_serverless_defenders(self):
         """
         get all expired serverless defenders
         """
         while True:
+            token = self.cwp_token
             response, status_code = prisma_get_expired_serverless_defenders(
-                token=self.cwp_token,
+                token=token,
                 cwp_endpoint=self._cwp_endpoint,
                 debug_mode=self._debug_mode,
             )
@@ -361,7 +452,7 @@ class Prisma():
                 print(
                     "Prisma API token expired... Generating a new one.")
 
-                self.get_cwp_token()
+                self.get_cwp_token(rejected=token)
 
                 continue
             elif status_code != 200:
@@ -381,9 +472,10 @@ class Prisma():
         refresh the member token property
         """
         while True:
+            token = self.cwp_token
             response, status_code = prisma_get_serverless_defender_zip(
                 runtime,
-                token=self.cwp_token,
+                token=token,
                 cwp_endpoint=self._cwp_endpoint,
                 debug_mode=self._debug_mode,
             )
@@ -392,7 +484,7 @@ class Prisma():
                 print(
                     "Prisma API token expired... Generating a new one.")
 
-                self.get_cwp_token()
+                self.get_cwp_token(rejected=token)
 
                 continue
             elif status_code != 200:
@@ -407,46 +499,101 @@ class Prisma():
 
         return response
 
-    def check_image_in_registry(self, image):
+    def build_registry_index(self):
         """
-        refresh the member token property
+        page through the registry scan results once and index their images
+
+        Raises:
+            RuntimeError: a page could not be read, so the index would be partial
         """
+        registry_index = set()
+        offset = self._request_offset
+        unauthorized = 0
         while True:
-            response, status_code = prisma_check_image_in_registry(
-                image,
-                token=self.cwp_token,
+            token = self.cwp_token
+            response, status_code = prisma_get_registry(
+                token=token,
                 cwp_endpoint=self._cwp_endpoint,
+                offset=offset,
+                limit=self._request_limit,
                 debug_mode=self._debug_mode,
             )
-        
-            if status_code == 401:
-                print(
+
+            if status_code == 401 and unauthorized < PRISMA_UNAUTHORIZED_RETRIES:
+                unauthorized += 1
+                logging.info(
                     "Prisma API token expired... Generating a new one.")
 
-                self.get_cwp_token()
+                self.get_cwp_token(rejected=token)
 
                 continue
             elif status_code != 200:
-                print(
-                    "Unexpected - Prisma API returned %s", status_code)
+                raise RuntimeError(f"registry page at offset {offset} returned {status_code}")
 
-                return None
+            unauthorized = 0
+            for entry in response:
+                registry_index.update(prisma_registry_image_keys(entry))
+            if len(response) < self._request_limit:
+                break
+            offset += self._request_limit
 
-            break
+        logging.info(f"Registry index built with {len(registry_index)} images.")
 
-        logging.info("Serverless Defender Zip downloaded.")
+        self._registry_index = registry_index
 
-        return response
+    def check_image_in_registry(self, image):
+        """
+        check whether the image has been scanned in a registry, using the registry index
+
+        Raises:
+            RuntimeError: the registry index could not be built this run
+        """
+        if self._registry_index is None:
+            with self._registry_index_lock:
+                if self._registry_index is None and self._registry_index_error is None:
+                    try:
+                        self.build_registry_index()
+                    except RuntimeError as e:
+                        logging.info("Registry index unavailable for this run: %s", e)
+                        self._registry_index_error = e
+        if self._registry_index_error is not None:
+            raise RuntimeError(f"registry index unavailable: {self._registry_index_error}")
+
+        return prisma_normalize_image(image) in self._registry_index
+
+    def protected_task_cache_key(self, params, task_definition):
+        """
+        Hash the canonical task definition, fargate params and console version.
+        """
+        latest_cwp_version = getattr(self, "_latest_cwp_version", None)
+        if latest_cwp_version is None:
+            return None
+        if isinstance(task_definition, str):
+            task_definition = json.loads(task_definition)
+        canonical = json.dumps(
+            {"taskDefinition": task_definition, "params": params, "version": latest_cwp_version},
+            sort_keys=True, separators=(",", ":"), default=str)
+
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
     def generate_protected_task(self, params, task_definition):
         """
-        refresh the member token property
+        generate the protected task definition, reusing cached results for identical inputs
         """
+        cache_key = self.protected_task_cache_key(params, task_definition)
+        if cache_key is not None:
+            response = PROTECTED_TASK_CACHE.get(cache_key)
+            if response is not None:
+                logging.info("Protected Task reused from cache.")
+
+                return response
+
         while True:
+            token = self.cwp_token
             response, status_code = prisma_generate_protected_task(
                 params,
                 task_definition,
-                token=self.cwp_token,
+                token=token,
                 cwp_endpoint=self._cwp_endpoint,
                 debug_mode=self._debug_mode,
             )
@@ -455,7 +602,7 @@ class Prisma():
                 print(
                     "Prisma API token expired... Generating a new one.")
 
-                self.get_cwp_token()
+                self.get_cwp_token(rejected=token)
 
                 continue
             elif status_code != 200:
@@ -467,6 +614,8 @@ class Prisma():
             break
 
         logging.info("Protected Task Generated.")
+        if cache_key is not None:
+            PROTECTED_TASK_CACHE.put(cache_key, response)
 
         return response
 
@@ -475,8 +624,9 @@ class Prisma():
         get the latest cwp version
         """
         while True:
+            token = self.cwp_token
             response, status_code = prisma_get_latest_version(
-                token=self._cwp_token,
+                token=token,
                 cwp_endpoint=self._cwp_endpoint,
                 debug_mode=self._debug_mode,
             )
@@ -485,7 +635,7 @@ class Prisma():
                 print(
                     "Prisma API token expired... Generating a new one.")
 
-                self.get_cwp_token()
+                self.get_cwp_token(rejected=token)
 
                 continue
             elif status_code != 200:
@@ -500,15 +650,101 @@ class Prisma():
 
         self._latest_cwp_version = response
 
-    def set_updated_fargate_image_and_bundle(self):
+    def load_default_task_definition(self) -> dict:
+        """
+        load the task definition the defender template is generated from
+        """
         with open('configurations/default_taskdef.json', 'r') as file:
             data = file.read()
-        task_definition_template = json.loads(data)
-        updated_defended_task_definition = self.generate_protected_task(self._fargate_params, json.dumps(task_definition_template))
-        for object in updated_defended_task_definition["containerDefinitions"][1]["environment"]:
-            if object["name"] == "INSTALL_BUNDLE":
-                self.updated_fargate_bundle = object["value"]
-        self._updated_fargate_image = updated_defended_task_definition["containerDefinitions"][1]["image"]
+
+        return json.loads(data)
+
+    def get_defender_template(self, template_store=None):
+        """
+        get the defended default task definition for the current console version
+
+        Looks in the in-memory/disk cache first, then in the optional template
+        store (an object with get_defender_template/put_defender_template, such as
+        the AWS configuration), and only asks Prisma when neither has it.
+        """
+        latest_cwp_version = getattr(self, "_latest_cwp_version", None)
+        if latest_cwp_version is None:
+            # without a version there is nothing to key the cache on
+            template_store = None
+        cache_key = self.defender_template_cache_key()
+        template = DEFENDER_TEMPLATE_CACHE.get(cache_key) if latest_cwp_version else None
+        if template is not None:
+            logging.info("Defender template for %s reused from cache.", self._latest_cwp_version)
+
+            return template
+
+        if template_store is not None:
+            template = template_store.get_defender_template(cache_key)
+            if template is not None:
+                logging.info("Defender template for %s reused from the template store.", self._latest_cwp_version)
+                DEFENDER_TEMPLATE_CACHE.put(cache_key, template)
+
+                return template
+
+        task_definition_template = self.load_default_task_definition()
+        template = self.generate_protected_task(self._fargate_params, json.dumps(task_definition_template))
+        if template is None:
+            return None
+
+        if latest_cwp_version is not None:
+            DEFENDER_TEMPLATE_CACHE.put(cache_key, template)
+        if template_store is not None:
+            template_store.put_defender_template(cache_key, template)
+
+        return template
+
+    def defender_template_cache_key(self) -> str:
+        """
+        key of the defender template for the console and its current version
+        """
+        return f"{self._console_addr}|{getattr(self, '_latest_cwp_version', None)}"
+
+    def clear_defender_template(self) -> None:
+        """
+        forget the defender template, image, bundle and renderer of the previous run
+        """
+        self._defender_template = None
+        self._updated_fargate_bundle = None
+        self._updated_fargate_image = None
+        self._protected_task_renderer = None
+        self._protected_task_renderer_key = None
+
+    def set_updated_fargate_image_and_bundle(self, template_store=None):
+        """
+        set the defender image and install bundle for the current console version
+        """
+        updated_defended_task_definition = self.get_defender_template(template_store)
+        updated_fargate_image = updated_fargate_bundle = None
+        for container in (updated_defended_task_definition or {}).get("containerDefinitions", []):
+            if container["name"] != "TwistlockDefender":
+                continue
+            for object in container.get("environment", []):
+                if object["name"] == "INSTALL_BUNDLE":
+                    updated_fargate_bundle = object["value"]
+            updated_fargate_image = container["image"]
+        if updated_fargate_image is None or updated_fargate_bundle is None:
+            # a warm container must not protect services with the previous run's defender
+            self.clear_defender_template()
+
+            raise RuntimeError("Defender template could not be generated.")
+        self._defender_template = updated_defended_task_definition
+        # warm containers keep the renderer until the template's cache key changes
+        cache_key = self.defender_template_cache_key() if getattr(self, "_latest_cwp_version", None) is not None else None
+        if self._local_task_rendering and (cache_key is None or cache_key != self._protected_task_renderer_key):
+            try:
+                self._protected_task_renderer = ProtectedTaskRenderer(
+                    self.load_default_task_definition(), updated_defended_task_definition)
+            except Exception:
+                self.clear_defender_template()
+                raise
+            self._protected_task_renderer_key = cache_key
+        self._updated_fargate_image = updated_fargate_image
+        self.updated_fargate_bundle = updated_fargate_bundle
         logging.info("Set updated fargate image and bundle for expired defenders.")
     ################################################################################
     # endregion member functions
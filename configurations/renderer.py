@@ -0,0 +1,290 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract local rendering of protected task definitions from scripts.
+
+Prisma's defended version of the default task definition shows everything the
+defender adds: the sidecar container, the entrypoint wrapper, and the
+environment, volumes and dependencies of the wrapped container. The renderer
+learns these additions by diffing the template against its source and applies
+them to other task definitions, so Prisma only has to be asked when an
+entrypoint must be extracted from an image.
+
+Values equal to the template's container image, container name or task family
+are learned as placeholders and filled in per task. Anything the diff cannot
+express as an addition (a changed value, a string that only partly mentions the
+template's own container or family) disables the renderer, and the renderer
+must reproduce the template from its source before it is used.
+"""
+import copy
+import json
+import logging
+
+# stand-ins for the wrapped container's image and name, and the task's family,
+# in the learned additions
+IMAGE_PLACEHOLDER = "\x00image\x00"
+NAME_PLACEHOLDER = "\x00name\x00"
+FAMILY_PLACEHOLDER = "\x00family\x00"
+
+
+class ProtectedTaskRenderer():
+    """
+    This class applies the defender additions learned from one template to task definitions.
+    """
+
+    def __init__(
+        self,
+        source: dict,
+        defended: dict,
+        defender_name="TwistlockDefender",
+    ):
+        self._defender_name = defender_name
+        self._task_patch = None
+        self._container_patch = None
+        self._entrypoint_prefix = None
+        self._layout = None
+        self._sidecars = {}
+        try:
+            self.learn(source, defended)
+            if canonical(self.render(copy.deepcopy(source), strict=True)) != canonical(defended):
+                raise ValueError("rendered template does not match Prisma's")
+        except (KeyError, TypeError, ValueError) as e:
+            logging.info("Protected tasks will be generated by Prisma, template could not be learned: %s", e)
+            self._task_patch = None
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def ready(self):
+        """
+        ready member property
+
+        Returns:
+        bool: whether task definitions can be rendered locally
+        """
+        return self._task_patch is not None
+
+    @property
+    def sidecar_names(self):
+        """
+        sidecar_names member property
+
+        Returns:
+        list: names of the containers added by the defender
+        """
+        return [name for name in self._layout or [] if name is not None]
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def learn(self, source: dict, defended: dict) -> None:
+        """
+        Learn the task, container and entrypoint additions from the template.
+        """
+        source_containers = source["containerDefinitions"]
+        if len(source_containers) != 1:
+            raise ValueError(f"template has {len(source_containers)} containers, expected 1")
+        source_container = source_containers[0]
+        image, name, family = source_container["image"], source_container["name"], source["family"]
+        if family in (image, name):
+            raise ValueError(f"template family {family} is also its container's image or name")
+        placeholders = {image: IMAGE_PLACEHOLDER, name: NAME_PLACEHOLDER, family: FAMILY_PLACEHOLDER}
+        defended_containers = defended["containerDefinitions"]
+        defended_container = next((container for container in defended_containers if container["name"] == name), None)
+        if defended_container is None:
+            raise ValueError(f"container {name} missing from the template")
+
+        # containers in template order, None where the wrapped containers go
+        self._layout = [None if container["name"] == name else container["name"] for container in defended_containers]
+        if self._defender_name not in self._layout:
+            raise ValueError(f"{self._defender_name} missing from the template")
+        # per-task values Prisma writes into the sidecars (FARGATE_TASK) follow the task's family
+        self._sidecars = {
+            container["name"]: substitute(container, {family: FAMILY_PLACEHOLDER})
+            for container in defended_containers if container["name"] != name
+        }
+
+        source_container = substitute(source_container, placeholders)
+        defended_container = substitute(defended_container, placeholders)
+        source_entrypoint = source_container.pop("entryPoint", None)
+        defended_entrypoint = defended_container.pop("entryPoint", None)
+        if not source_entrypoint or defended_entrypoint[-len(source_entrypoint):] != source_entrypoint:
+            raise ValueError(f"entrypoint {defended_entrypoint!r} does not wrap {source_entrypoint!r}")
+        self._entrypoint_prefix = defended_entrypoint[:-len(source_entrypoint)]
+        self._container_patch = learn_patch(source_container, defended_container, "container")
+
+        source_task = {key: value for key, value in source.items() if key != "containerDefinitions"}
+        defended_task = {key: value for key, value in defended.items() if key != "containerDefinitions"}
+        task_patch = learn_patch(substitute(source_task, {family: FAMILY_PLACEHOLDER}), substitute(defended_task, {family: FAMILY_PLACEHOLDER}), "task")
+
+        for where, value in (("sidecar", self._sidecars), ("task", task_patch), ("container", self._container_patch), ("entrypoint", self._entrypoint_prefix)):
+            if mentions(value, (image, name, family)):
+                raise ValueError(f"{where} additions refer to the template's own container or family")
+        self._task_patch = task_patch
+
+    def render(self, task_definition: dict, strict=False):
+        """
+        Apply the learned additions to a task definition.
+
+        Args:
+            task_definition (dict): task definition whose containers all have an entryPoint
+            strict (bool, optional): raise instead of returning None
+
+        Returns:
+            dict: protected task definition, or None when Prisma must generate it
+        """
+        if self._task_patch is None and not strict:
+            return None
+        try:
+            containers = task_definition["containerDefinitions"]
+            for container in containers:
+                if not container.get("entryPoint"):
+                    raise ValueError(f"container {container['name']} needs its entrypoint extracted")
+                if container["name"] in self._sidecars:
+                    raise ValueError(f"container {container['name']} is already a defender sidecar")
+
+            family = task_definition["family"]
+            rendered = {key: copy.deepcopy(value) for key, value in task_definition.items() if key != "containerDefinitions"}
+            apply_patch(rendered, fill(self._task_patch, {FAMILY_PLACEHOLDER: family}), "task")
+            wrapped = [self.render_container(container, family) for container in containers]
+        except (KeyError, TypeError, ValueError) as e:
+            if strict:
+                raise
+            logging.info("Protected task for %s will be generated by Prisma: %s", task_definition.get("family"), e)
+
+            return None
+
+        rendered["containerDefinitions"] = []
+        for name in self._layout:
+            if name is None:
+                rendered["containerDefinitions"].extend(wrapped)
+            else:
+                rendered["containerDefinitions"].append(fill(self._sidecars[name], {FAMILY_PLACEHOLDER: family}))
+
+        return rendered
+
+    def render_container(self, container: dict, family: str) -> dict:
+        """
+        Wrap one container's entrypoint and add the defender settings to it.
+        """
+        values = {IMAGE_PLACEHOLDER: container["image"], NAME_PLACEHOLDER: container["name"], FAMILY_PLACEHOLDER: family}
+        rendered = copy.deepcopy(container)
+        entrypoint = rendered.pop("entryPoint")
+        apply_patch(rendered, fill(self._container_patch, values), f"container {container['name']}")
+        rendered["entryPoint"] = fill(self._entrypoint_prefix, values) + entrypoint
+
+        return rendered
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+def canonical(value) -> str:
+    """
+    Serialize a task definition independently of key order.
+    """
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def substitute(value, placeholders: dict):
+    """
+    Copy the value, replacing strings equal to a key of placeholders with its placeholder.
+    """
+    if isinstance(value, dict):
+        return {key: substitute(item, placeholders) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, placeholders) for item in value]
+    if isinstance(value, str) and value in placeholders:
+        return placeholders[value]
+
+    return value
+
+
+def fill(value, values: dict):
+    """
+    Copy the value, replacing each placeholder with its value.
+    """
+    if isinstance(value, dict):
+        return {key: fill(item, values) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, values) for item in value]
+    if isinstance(value, str) and value in values:
+        return values[value]
+
+    return value
+
+
+def mentions(value, needles) -> bool:
+    """
+    Check if any string in the value contains one of the needles.
+    """
+    if isinstance(value, dict):
+        return any(mentions(item, needles) for item in value.values())
+    if isinstance(value, list):
+        return any(mentions(item, needles) for item in value)
+    if isinstance(value, str):
+        return any(needle in value for needle in needles)
+
+    return False
+
+
+def learn_patch(source: dict, defended: dict, path: str) -> dict:
+    """
+    Describe how the defended dict extends the source dict.
+
+    Only additions are learned: new keys, items appended to lists and keys added
+    to nested dicts. Removed keys are recorded as removals.
+
+    Raises:
+        ValueError: a value was changed rather than extended
+    """
+    patch = {"remove": [], "set": {}, "append": {}, "merge": {}}
+    for key in source:
+        if key not in defended:
+            patch["remove"].append(key)
+    for key, value in defended.items():
+        if key not in source:
+            patch["set"][key] = value
+            continue
+        original = source[key]
+        if value == original:
+            continue
+        if isinstance(value, list) and isinstance(original, list) and value[:len(original)] == original:
+            patch["append"][key] = value[len(original):]
+        elif isinstance(value, dict) and isinstance(original, dict):
+            patch["merge"][key] = learn_patch(original, value, f"{path}.{key}")
+        else:
+            raise ValueError(f"{path}.{key} changed from {original!r} to {value!r}")
+
+    return patch
+
+
+def apply_patch(target: dict, patch: dict, path: str) -> None:
+    """
+    Apply a patch from learn_patch to the target in place.
+
+    Raises:
+        ValueError: the target already has a different value where the patch adds one
+    """
+    for key in patch["remove"]:
+        target.pop(key, None)
+    for key, value in patch["set"].items():
+        if key in target and target[key] != value:
+            raise ValueError(f"{path}.{key} is already set to {target[key]!r}")
+        target[key] = copy.deepcopy(value)
+    for key, items in patch["append"].items():
+        current = target.setdefault(key, [])
+        for item in items:
+            if item in current:
+                continue
+            if isinstance(item, dict) and "name" in item and any(isinstance(other, dict) and other.get("name") == item["name"] for other in current):
+                raise ValueError(f"{path}.{key} already has a different {item['name']}")
+            current.append(copy.deepcopy(item))
+    for key, sub_patch in patch["merge"].items():
+        current = target.setdefault(key, {})
+        if not isinstance(current, dict):
+            raise ValueError(f"{path}.{key} is not an object")
+        apply_patch(current, sub_patch, f"{path}.{key}")
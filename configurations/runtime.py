@@ -0,0 +1,274 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract the per-container runtime context from scripts.
+
+Lambda keeps module state between invocations of a warm container, so the code,
+Prisma and AWS configurations (with their boto3 session and clients) are built
+once and handed to every invocation. The context is rebuilt when the
+environment changes or after a credential error.
+
+The Prisma and AWS configurations, and with them requests and boto3, are only
+imported and built when an invocation first uses them.
+"""
+import os
+import sys
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from configurations.code import Configurations
+from configurations.sweep import ECS_STAGES, resolve_stage_workers
+from configurations.imports import lazy_import
+
+prisma_module = lazy_import("configurations.prisma")
+aws_module = lazy_import("configurations.aws")
+prisma_functions = lazy_import("implementation_functions.prisma_implementation_functions")
+
+# error codes after which cached clients and credentials must not be reused
+CREDENTIAL_ERROR_CODES = (
+    "ExpiredToken",
+    "ExpiredTokenException",
+    "InvalidClientTokenId",
+    "UnrecognizedClientException",
+    "InvalidSignatureException",
+)
+
+# environment variables that change between invocations of the same container
+VOLATILE_ENVIRONMENT = ("_X_AMZN_TRACE_ID",)
+
+
+class RuntimeContext():
+    """
+    This class holds the configurations shared by the invocations of one container.
+    """
+
+    def __init__(
+        self,
+        local_run: bool,
+    ):
+        self._local_run = local_run
+        self._fingerprint = environment_fingerprint()
+        self._code_conf = Configurations(
+            local_run=local_run,
+            status_code=0,
+            task="Initializing code configurations",
+            status_text="",
+        )
+        self._prisma_conf = None
+        self._aws_conf = None
+        # separate locks, so pre-warming builds both configurations at once
+        self._prisma_lock = threading.Lock()
+        self._aws_lock = threading.Lock()
+        self._invocations = 0
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def code_conf(self):
+        """
+        code_conf member property
+
+        Returns:
+        Configurations: code_conf
+        """
+        return self._code_conf
+
+    @property
+    def prisma_conf(self):
+        """
+        prisma_conf member property
+
+        Returns:
+        Prisma: prisma_conf, built on first use
+        """
+        if self._prisma_conf is None:
+            with self._prisma_lock:
+                if self._prisma_conf is None:
+                    self._prisma_conf = prisma_module.Prisma(
+                        local_run=self._local_run,
+                        request_offset=0,
+                        request_limit=50,
+                        debug_mode=self._code_conf.debug_mode
+                    )
+
+        return self._prisma_conf
+
+    @property
+    def aws_conf(self):
+        """
+        aws_conf member property
+
+        Returns:
+        AWS: aws_conf, built on first use
+        """
+        if self._aws_conf is None:
+            with self._aws_lock:
+                if self._aws_conf is None:
+                    stage_workers = resolve_stage_workers(self._code_conf.sweep_max_workers, self._code_conf.sweep_stage_workers)
+                    self._aws_conf = aws_module.AWS(
+                        local_run=self._local_run,
+                        debug_mode=self._code_conf.debug_mode,
+                        # one connection per worker of the stages sharing the ECS client
+                        max_pool_connections=sum(stage_workers[stage] for stage in ECS_STAGES)
+                    )
+
+        return self._aws_conf
+
+    @property
+    def invocations(self):
+        """
+        invocations member property
+
+        Returns:
+        int: invocations
+        """
+        return self._invocations
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def is_stale(self) -> bool:
+        """
+        Check if the environment changed since the context was built.
+        """
+        return self._fingerprint != environment_fingerprint()
+
+    def start_invocation(self) -> None:
+        """
+        Reset the state that must not carry over from the previous invocation.
+        """
+        self._invocations += 1
+        self._code_conf.start_run()
+        if self._prisma_conf is not None:
+            self._prisma_conf.start_run()
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+_runtime_context = None
+_runtime_context_lock = threading.Lock()
+
+
+def environment_fingerprint() -> str:
+    """
+    Hash the environment, ignoring variables that change per invocation.
+
+    Returns:
+        str: environment fingerprint
+    """
+    items = sorted((key, value) for key, value in os.environ.items() if key not in VOLATILE_ENVIRONMENT)
+
+    return hashlib.sha256(repr(items).encode("utf-8")).hexdigest()
+
+
+def get_runtime_context(local_run: bool) -> RuntimeContext:
+    """
+    Return the container's runtime context, building it on the first invocation
+    or after the environment changed or reset_runtime_context was called.
+
+    Args:
+        local_run (bool): running outside of Lambda
+
+    Returns:
+        RuntimeContext: runtime context ready for this invocation
+    """
+    global _runtime_context  # pylint: disable=global-statement
+    with _runtime_context_lock:
+        if _runtime_context is None or _runtime_context.is_stale():
+            logging.info("Building runtime context.")
+            if _runtime_context is not None:
+                clear_account_sessions()
+            _runtime_context = RuntimeContext(local_run=local_run)
+        else:
+            logging.info("Reusing runtime context from %s previous invocations.", _runtime_context.invocations)
+        _runtime_context.start_invocation()
+
+        return _runtime_context
+
+
+def reset_runtime_context() -> None:
+    """
+    Drop the runtime context so the next invocation builds fresh clients.
+    """
+    global _runtime_context  # pylint: disable=global-statement
+    with _runtime_context_lock:
+        _runtime_context = None
+    clear_account_sessions()
+
+
+def clear_account_sessions() -> None:
+    """
+    Drop the assumed-role sessions, if the AWS configuration was ever imported.
+    """
+    if "configurations.aws" not in sys.modules:
+        return
+    with aws_module.ACCOUNT_SESSIONS_LOCK:
+        aws_module.ACCOUNT_SESSIONS.clear()
+
+
+def timed_step(timings: dict, name: str, step) -> None:
+    """
+    Run one pre-warm step, recording its duration and logging any failure.
+    """
+    start = time.perf_counter()
+    try:
+        step()
+    except Exception as e:  # pylint: disable=broad-except
+        logging.info("Pre-warm step %s failed: %s", name, e)
+    timings[name] = round(time.perf_counter() - start, 3)
+
+
+def prewarm_runtime_context(local_run: bool) -> dict:
+    """
+    Build the runtime context and open its connections during Lambda's init phase.
+
+    Client construction (model loading, endpoint resolution) overlaps with the TLS
+    handshake to the Prisma console. Once the clients exist, the ECS connection
+    and the Prisma secret fetch run in parallel. Failures are logged and left for
+    the first invocation to retry.
+
+    Args:
+        local_run (bool): running outside of Lambda
+
+    Returns:
+        dict: seconds spent per step
+    """
+    global _runtime_context  # pylint: disable=global-statement
+    timings = {}
+    contexts = []
+    built = []
+    start = time.perf_counter()
+
+    timed_step(timings, "code_conf", lambda: contexts.append(RuntimeContext(local_run=local_run)))
+
+    def build_aws_conf():
+        contexts[0].aws_conf  # pylint: disable=pointless-statement
+        built.append(True)
+
+    def open_prisma_connection():
+        # builds the context's Prisma configuration, which only reads the environment
+        prisma_functions.prisma_open_connection(contexts[0].prisma_conf.cwp_endpoint)
+
+    if contexts:
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            build = pool.submit(timed_step, timings, "runtime_context", build_aws_conf)
+            pool.submit(timed_step, timings, "prisma_connection", open_prisma_connection)
+            build.result()
+            if built:
+                aws_conf = contexts[0].aws_conf
+                pool.submit(timed_step, timings, "ecs_connection", aws_conf.open_ecs_connection)
+                pool.submit(timed_step, timings, "prisma_secrets", aws_conf.get_prisma_secrets)
+
+    if built:
+        with _runtime_context_lock:
+            _runtime_context = contexts[0]
+    timings["total"] = round(time.perf_counter() - start, 3)
+    logging.info("Pre-warm finished: %s", timings)
+
+    return timings
@@ -0,0 +1,158 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract the pacing of ECS mutations from scripts.
+
+RegisterTaskDefinition and UpdateService have low rate limits, and every sweep
+worker of an account/region calls them through the same ECS client. botocore's
+adaptive retry mode has the right machinery (a TokenBucket whose rate follows a
+cubic curve, cut on every throttle) but keeps one limiter per client and applies
+it to every operation. Here the same ClientRateLimiter is hooked into the
+mutation operations only, with one limiter per account/region shared by all its
+clients, so sustained throughput settles just under the API's ceiling while
+reads stay unpaced. Retries themselves are left to the client's retry handler.
+"""
+import time
+import logging
+import threading
+import weakref
+from botocore.retries import adaptive, bucket, standard, throttling
+
+# ECS operations paced by the mutation scheduler
+MUTATION_OPERATIONS = ("RegisterTaskDefinition", "UpdateService")
+
+
+class MutationScheduler():
+    """
+    This class paces ECS mutation requests of one account/region and counts their outcomes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+    ):
+        self._name = name
+        clock = bucket.Clock()
+        self._token_bucket = bucket.TokenBucket(max_rate=1, clock=clock)
+        self._rate_clocker = adaptive.RateClocker(clock)
+        self._limiter = adaptive.ClientRateLimiter(
+            rate_adjustor=throttling.CubicCalculator(starting_max_rate=0, start_time=clock.current_time()),
+            rate_clocker=self._rate_clocker,
+            token_bucket=self._token_bucket,
+            throttling_detector=standard.ThrottlingErrorDetector(retry_event_adapter=standard.RetryEventAdapter()),
+            clock=clock,
+        )
+        self._throttling_detector = standard.ThrottlingErrorDetector(retry_event_adapter=standard.RetryEventAdapter())
+        self._clients = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._throttled = 0
+        self._waited = 0.0
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def name(self):
+        """
+        name member property
+
+        Returns:
+        str: name
+        """
+        return self._name
+
+    @property
+    def metrics(self):
+        """
+        metrics member property
+
+        Returns:
+        dict: requests sent and throttled, seconds spent waiting for the limiter,
+            the measured send rate and, once throttled, the allowed send rate
+        """
+        throttled = self._throttled > 0
+
+        return {
+            "sent": self._sent,
+            "throttled": self._throttled,
+            "waited": round(self._waited, 3),
+            "measured_rate": round(self._rate_clocker.measured_rate, 3),
+            "max_rate": round(self._token_bucket.max_rate, 3) if throttled else None,
+        }
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def attach(self, client) -> None:
+        """
+        Pace the mutation operations of an ECS client. Attaching a client twice has no effect.
+        """
+        with self._lock:
+            if client in self._clients:
+                return
+            self._clients.add(client)
+        for operation in MUTATION_OPERATIONS:
+            client.meta.events.register(f"before-send.ecs.{operation}", self.on_sending_request)
+            client.meta.events.register(f"needs-retry.ecs.{operation}", self.on_receiving_response)
+
+    def on_sending_request(self, request, **kwargs) -> None:
+        """
+        Wait for a token before each attempt, once ECS has throttled.
+        """
+        start = time.perf_counter()
+        self._limiter.on_sending_request(request, **kwargs)
+        with self._lock:
+            self._sent += 1
+            self._waited += time.perf_counter() - start
+
+    def on_receiving_response(self, **kwargs) -> None:
+        """
+        Adjust the send rate after each attempt.
+        """
+        self._limiter.on_receiving_response(**kwargs)
+        if self._throttling_detector.is_throttling_error(**kwargs):
+            with self._lock:
+                self._throttled += 1
+            logging.info("ECS mutation throttled in %s, send rate now %.2f/s.", self._name, self._token_bucket.max_rate)
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+MUTATION_SCHEDULERS = {}
+MUTATION_SCHEDULERS_LOCK = threading.Lock()
+
+
+def get_mutation_scheduler(account_id, region: str) -> MutationScheduler:
+    """
+    Return the scheduler shared by every ECS client of the account and region.
+
+    Args:
+        account_id (str): account ID, None for the home account
+        region (str): AWS region
+
+    Returns:
+        MutationScheduler: scheduler
+    """
+    key = f"{account_id or 'home account'}/{region}"
+    with MUTATION_SCHEDULERS_LOCK:
+        if key not in MUTATION_SCHEDULERS:
+            MUTATION_SCHEDULERS[key] = MutationScheduler(key)
+
+        return MUTATION_SCHEDULERS[key]
+
+
+def mutation_metrics() -> dict:
+    """
+    Return the metrics of every scheduler.
+
+    Returns:
+        dict: metrics per account/region
+    """
+    with MUTATION_SCHEDULERS_LOCK:
+        schedulers = list(MUTATION_SCHEDULERS.values())
+
+    return {scheduler.name: scheduler.metrics for scheduler in schedulers}
@@ -0,0 +1,161 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract the persisted sweep state from scripts.
+
+The state maps each service ARN to the task definition and defender version it
+was last seen with, so that unchanged services can be skipped on the next run.
+Backends are any object with `load() -> dict` and `save(dict)`.
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+
+class FileStateBackend():
+    """
+    This class stores the sweep state as a JSON file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+    ):
+        self._path = path
+
+    @property
+    def path(self):
+        """
+        path member property
+
+        Returns:
+        str: path
+        """
+        return self._path
+
+    def load(self) -> dict:
+        """
+        Read the state file, or start empty if it is missing or unreadable.
+        """
+        try:
+            with open(self._path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.info("Sweep state at %s could not be read: %s", self._path, e)
+
+            return {}
+
+    def save(self, state: dict) -> None:
+        """
+        Atomically replace the state file.
+        """
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self._path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temp_path, self._path)
+
+
+class SweepState():
+    """
+    This class tracks which services were already checked at the current version.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_age=86400,
+    ):
+        self._backend = backend
+        self._max_age = max_age
+        self._entries = backend.load()
+        self._lock = threading.Lock()
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def entries(self):
+        """
+        entries member property
+
+        Returns:
+        dict: entries
+        """
+        return self._entries
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def is_current(self, service: dict, defender_version: str) -> bool:
+        """
+        Check if a described service is unchanged since it was last found defended.
+
+        The service must still point at the recorded task definition, the console
+        version must match, the entry must be younger than max_age and every
+        deployment must be on that task definition (no rollout in flight).
+        """
+        entry = self._entries.get(service["serviceArn"])
+        if entry is None or defender_version is None:
+            return False
+        if entry["taskDefinitionArn"] != service.get("taskDefinition"):
+            return False
+        if entry["defenderVersion"] != defender_version:
+            return False
+        if time.time() - entry["lastChecked"] > self._max_age:
+            return False
+
+        return all(
+            deployment.get("taskDefinition") == entry["taskDefinitionArn"]
+            for deployment in service.get("deployments", [])
+        )
+
+    def record(self, cluster: str, service_arn: str, task_definition_arn: str, defender_version: str) -> None:
+        """
+        Remember that the service runs a defended task definition.
+        """
+        with self._lock:
+            self._entries[service_arn] = {
+                "cluster": cluster,
+                "taskDefinitionArn": task_definition_arn,
+                "defenderVersion": defender_version,
+                "lastChecked": time.time(),
+            }
+
+    def forget(self, service_arn: str) -> None:
+        """
+        Drop the service so it is checked again next run.
+        """
+        with self._lock:
+            self._entries.pop(service_arn, None)
+
+    def prune(self, cluster: str, service_arns) -> None:
+        """
+        Drop services of the cluster that no longer exist.
+        """
+        service_arns = set(service_arns)
+        with self._lock:
+            for service_arn in [arn for arn, entry in self._entries.items() if entry["cluster"] == cluster and arn not in service_arns]:
+                del self._entries[service_arn]
+
+    def save(self) -> None:
+        """
+        Persist the state through the backend.
+        """
+        # held while saving, as concurrent sweeps may share one state
+        with self._lock:
+            try:
+                self._backend.save(dict(self._entries))
+            except Exception as e:  # pylint: disable=broad-except
+                logging.info("Sweep state could not be saved: %s", e)
+    ################################################################################
+    # endregion member functions
+    ################################################################################
@@ -0,0 +1,795 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract the ECS defender sweep from scripts.
+"""
+import copy
+import json
+import time
+import hashlib
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+# stages of the sweep pipeline, in order
+SWEEP_STAGES = ("discover", "classify", "protect", "register", "rollout")
+
+# stages whose workers call ECS through the sweep's shared client
+ECS_STAGES = ("discover", "classify", "register", "rollout")
+
+# tells a stage worker that no more items will come
+STOP = object()
+
+
+class Stage():
+    """
+    This class is one step of the sweep pipeline: a bounded input queue and a
+    fixed number of workers.
+
+    The handler returns the items for the next stage, which are put on its queue
+    as they are produced; a full queue blocks the handler (backpressure). With a
+    partition key, every worker has its own queue, so items with the same key
+    are handled one at a time, in arrival order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler,
+        workers=1,
+        queue_size=0,
+        downstream=None,
+        partition_key=None,
+        on_error=None,
+    ):
+        self._name = name
+        self._handler = handler
+        self._workers = max(1, int(workers))
+        self._downstream = downstream
+        self._partition_key = partition_key
+        self._on_error = on_error
+        self._queues = [queue.Queue(maxsize=max(0, int(queue_size))) for _ in range(self._workers if partition_key else 1)]
+        self._pool = None
+        self._futures = []
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._failed = 0
+        self._busy = 0.0
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def name(self):
+        """
+        name member property
+
+        Returns:
+        str: name
+        """
+        return self._name
+
+    @property
+    def workers(self):
+        """
+        workers member property
+
+        Returns:
+        int: workers
+        """
+        return self._workers
+
+    @property
+    def stats(self):
+        """
+        stats member property
+
+        Returns:
+        dict: items processed and failed, and seconds spent in the handler
+        """
+        return {"workers": self._workers, "processed": self._processed, "failed": self._failed, "busy": round(self._busy, 3)}
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def start(self) -> None:
+        """
+        Start the workers.
+        """
+        self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix=f"sweep-{self._name}")
+        self._futures = [
+            self._pool.submit(self.work, self._queues[index % len(self._queues)])
+            for index in range(self._workers)
+        ]
+
+    def put(self, item) -> None:
+        """
+        Queue an item, blocking while the queue is full.
+        """
+        index = hash(self._partition_key(item)) % len(self._queues) if self._partition_key else 0
+        self._queues[index].put(item)
+
+    def close(self) -> None:
+        """
+        Wait until every queued item was handled and stop the workers.
+
+        Everything this stage produced is queued downstream once close returns.
+        """
+        for index in range(self._workers):
+            self._queues[index % len(self._queues)].put(STOP)
+        for future in self._futures:
+            future.result()
+        self._pool.shutdown()
+
+    def work(self, work_queue) -> None:
+        """
+        Handle items from the queue until told to stop.
+        """
+        while True:
+            item = work_queue.get()
+            if item is STOP:
+                return
+            start = time.perf_counter()
+            failed = False
+            try:
+                for output in self._handler(item) or ():
+                    self._downstream.put(output)
+            except Exception as e:  # pylint: disable=broad-except
+                failed = True
+                logging.info("Sweep stage %s failed: %s", self._name, e)
+                if self._on_error is not None:
+                    self._on_error(item, e)
+            with self._lock:
+                self._processed += 1
+                self._failed += failed
+                self._busy += time.perf_counter() - start
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+class Sweep():
+    """
+    This class walks every ECS cluster and deploys or updates the Fargate defender.
+
+    The sweep is a pipeline of stages connected by bounded queues, each with its
+    own number of workers, so ECS reads, Prisma calls and ECS mutations overlap:
+
+        discover  list and describe a cluster's Fargate services
+        classify  describe each service's task definition and check its defender
+        protect   build the defended task definition (local render or Prisma)
+        register  register the defended task definition
+        rollout   point the service at it
+
+    Rollouts are routed by cluster, so one cluster's services are updated one at
+    a time, in the order they reach the stage.
+
+    Defended revisions are tagged with a hash of their source task definition and
+    defender version. Services whose task definitions share a family and hash
+    share one defended revision: the first to reach the protect stage builds and
+    registers it, the others wait on its registration and go straight to rollout
+    once it is done. Before registering, the family's revisions newer than the
+    source are searched for the hash, so a rerun reuses the revision an earlier
+    run registered.
+    """
+
+    def __init__(
+        self,
+        aws_conf,
+        prisma_conf,
+        max_workers=8,
+        state=None,
+        skip_non_fargate_clusters=False,
+        stage_workers=None,
+        queue_size=None,
+        registry_type="",
+        registry_credential_id="",
+    ):
+        self._aws_conf = aws_conf
+        self._state = state
+        self._skip_non_fargate_clusters = skip_non_fargate_clusters
+        self._prisma_conf = prisma_conf
+        self._max_workers = max(1, int(max_workers))
+        self._stage_workers = resolve_stage_workers(self._max_workers, stage_workers)
+        self._queue_size = queue_size or self._max_workers * 4
+        self._registry_type = registry_type
+        self._registry_credential_id = registry_credential_id
+        self._report = []
+        self._report_lock = threading.Lock()
+        self._stage_stats = {}
+        # (family, source hash) -> Future of the defended revision's ARN
+        self._registrations = {}
+        self._registrations_lock = threading.Lock()
+        self._rollout = None
+        # family -> Future of its newest revision ARNs
+        self._family_revisions = {}
+        # revision ARN -> source hash tag, None when untagged
+        self._revision_hashes = {}
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def max_workers(self):
+        """
+        max_workers member property
+
+        Returns:
+        int: max_workers
+        """
+        return self._max_workers
+
+    @property
+    def stage_workers(self):
+        """
+        stage_workers member property
+
+        Returns:
+        dict: workers per stage
+        """
+        return self._stage_workers
+
+    @property
+    def stage_stats(self):
+        """
+        stage_stats member property
+
+        Returns:
+        dict: stats per stage of the last run
+        """
+        return self._stage_stats
+
+    @property
+    def target(self):
+        """
+        target member property
+
+        Returns:
+        str: account and region being swept
+        """
+        return f"{self._aws_conf.account_id or 'home account'}/{self._aws_conf.aws_region}"
+
+    @property
+    def state(self):
+        """
+        state member property
+
+        Returns:
+        SweepState: state, or None when every service is checked each run
+        """
+        return self._state
+
+    @property
+    def report(self):
+        """
+        report member property
+
+        Returns:
+        list: report
+        """
+        return self._report
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def run(self) -> list:
+        """
+        Sweep every cluster and return the per-service report.
+        """
+        try:
+            clusters = self.plan_clusters(self._aws_conf.get_ecs_clusters())
+        except Exception as e:  # pylint: disable=broad-except
+            self.add_target_failure(e)
+
+            return self._report
+        self._registrations = {}
+        self._family_revisions = {}
+        self._revision_hashes = {}
+        logging.info("Sweeping %s clusters of %s with stage workers %s.", len(clusters), self.target, self._stage_workers)
+
+        stages = self.build_stages()
+        for stage in stages:
+            stage.start()
+        try:
+            for cluster, capacity_provider_pass in clusters:
+                stages[0].put({"cluster": cluster, "capacity_provider_pass": capacity_provider_pass})
+        finally:
+            # in pipeline order, so each stage has all of its input before it stops
+            for stage in stages:
+                stage.close()
+        self._stage_stats = {stage.name: stage.stats for stage in stages}
+        logging.info("Sweep stages of %s: %s", self.target, self._stage_stats)
+        logging.info("Sweep of %s built %s defended revisions for %s rollouts.", self.target, len(self._registrations), self._stage_stats["rollout"]["processed"])
+        if self._state is not None:
+            self._state.save()
+
+        return self._report
+
+    def build_stages(self) -> list:
+        """
+        Create the pipeline stages, last stage first so each can feed the next.
+        """
+        handlers = {
+            "discover": self.discover_cluster,
+            "classify": self.classify_service,
+            "protect": self.protect_service,
+            "register": self.register_service,
+            "rollout": self.roll_out_service,
+        }
+        stages = []
+        downstream = None
+        for name in reversed(SWEEP_STAGES):
+            downstream = Stage(
+                name,
+                handlers[name],
+                workers=self._stage_workers[name],
+                queue_size=self._queue_size,
+                downstream=downstream,
+                partition_key=(lambda item: item["cluster"]) if name == "rollout" else None,
+                on_error=self.add_failure,
+            )
+            stages.insert(0, downstream)
+        self._rollout = stages[-1]
+
+        return stages
+
+    def summary(self) -> dict:
+        """
+        Count the report entries by status.
+        """
+        return summarize_report(self._report)
+
+    def add_result(self, cluster, service_arn, status, task_definition_arn=None, error=None) -> None:
+        """
+        Record the outcome for one service.
+        """
+        result = {
+            "account": self._aws_conf.account_id,
+            "region": self._aws_conf.aws_region,
+            "cluster": cluster,
+            "service": service_arn,
+            "status": status,
+            "taskDefinition": task_definition_arn,
+        }
+        if error is not None:
+            result.update(error_details(error))
+        with self._report_lock:
+            self._report.append(result)
+
+    def add_target_failure(self, error) -> None:
+        """
+        Record that the account/region could not be swept at all.
+        """
+        logging.info("Sweep of %s failed: %s", self.target, error)
+        self.add_result(None, None, "failed", error=error)
+
+    def add_failure(self, item, error) -> None:
+        """
+        Record a pipeline item whose stage raised.
+        """
+        logging.info(f"Sweep of {item.get('service_arn') or item['cluster']} failed: {error}")
+        self.add_result(item["cluster"], item.get("service_arn"), "failed", error=error)
+
+    def plan_clusters(self, cluster_arns) -> list:
+        """
+        Pre-screen clusters with describe_clusters and order them for the sweep.
+
+        Inactive clusters and clusters without active services are dropped.
+        Clusters with no Fargate capacity provider and no Fargate services or tasks
+        in their statistics are swept last, or skipped when configured.
+
+        Returns:
+            list: (cluster ARN, whether capacity provider services need listing)
+        """
+        cluster_descs = self._aws_conf.describe_ecs_clusters(cluster_arns)
+        fargate_clusters = []
+        other_clusters = []
+        for cluster_arn in cluster_arns:
+            cluster = cluster_descs["clusters"].get(cluster_arn)
+            if cluster is None:
+                # could not be screened, sweep it fully
+                fargate_clusters.append((cluster_arn, True))
+                continue
+            if cluster.get("status") != "ACTIVE" or cluster.get("activeServicesCount", 0) == 0:
+                logging.info(f"Skipping cluster {cluster_arn}: {cluster.get('status')} with {cluster.get('activeServicesCount', 0)} services")
+                continue
+
+            statistics = {statistic["name"]: statistic["value"] for statistic in cluster.get("statistics", [])}
+            fargate_capacity = any(provider in ("FARGATE", "FARGATE_SPOT") for provider in cluster.get("capacityProviders", []))
+            fargate_activity = any(
+                int(statistics.get(name, 0)) > 0
+                for name in ("activeFargateServiceCount", "drainingFargateServiceCount", "runningFargateTasksCount", "pendingFargateTasksCount")
+            )
+            if fargate_capacity or fargate_activity:
+                fargate_clusters.append((cluster_arn, fargate_capacity))
+            elif self._skip_non_fargate_clusters:
+                logging.info(f"Skipping cluster {cluster_arn}: no Fargate capacity")
+            else:
+                other_clusters.append((cluster_arn, False))
+
+        return fargate_clusters + other_clusters
+
+    def discover_cluster(self, item):
+        """
+        List and describe a cluster's Fargate services and pass on those that need checking.
+        """
+        cluster = item["cluster"]
+        logging.info(f"Accessing cluster: {cluster}")
+        service_arns = self._aws_conf.get_cluster_fargate_services(cluster, capacity_provider_pass=item["capacity_provider_pass"])
+        service_descs = self._aws_conf.get_service_descs(service_arns, cluster)
+        for service_arn, failure in service_descs["failures"].items():
+            logging.info(f"Service {service_arn} could not be described: {failure.get('reason')}")
+            self.add_result(cluster, service_arn, "failed")
+
+        if self._state is not None:
+            self._state.prune(cluster, service_arns)
+
+        for service_arn, service_desc in service_descs["services"].items():
+            service, is_fargate = self._aws_conf.is_fargate_service({"services": [service_desc]})
+            if not is_fargate:
+                continue
+            if self._state is not None and self._state.is_current(service, self._prisma_conf.latest_cwp_version):
+                self.add_result(cluster, service_arn, "unchanged", service["taskDefinition"])
+                continue
+            yield {"cluster": cluster, "service_arn": service_arn, "service": service}
+
+    def classify_service(self, item):
+        """
+        Describe the service's task definition and check its defender status.
+        """
+        cluster, service_arn, service = item["cluster"], item["service_arn"], item["service"]
+        logging.info(f"Service {service_arn} is Fargate, checking defended status")
+        task_definition, defender_status = self._aws_conf.get_fargate_defender_status(self._prisma_conf.latest_cwp_version, service["taskDefinition"])
+        if defender_status == "failed":
+            logging.info(f"Task definition for {service_arn} could not be described")
+            self.add_result(cluster, service_arn, defender_status)
+            return
+        if defender_status not in ("undefended", "outdated"):
+            logging.info("Task definition is defended and defender is updated.")
+            self.record_defended(cluster, service_arn, service["taskDefinition"])
+            self.add_result(cluster, service_arn, defender_status)
+            return
+
+        yield dict(item, task_definition=task_definition, defender_status=defender_status)
+
+    def protect_service(self, item):
+        """
+        Build the defended task definition for the service, unless another
+        service with the same family and source hash already did.
+        """
+        family = item["task_definition"]["family"]
+        source_hash = protection_hash(self.strip_task_definition(copy.deepcopy(item["task_definition"])), self._prisma_conf.latest_cwp_version)
+        with self._registrations_lock:
+            registration = self._registrations.get((family, source_hash))
+            shared = registration is not None
+            if not shared:
+                registration = self._registrations[(family, source_hash)] = Future()
+        if shared:
+            logging.info(f"Service {item['service_arn']} shares the defended revision of {item['service']['taskDefinition']}")
+            registration.add_done_callback(lambda future: self.follow_registration(item, future))
+            return
+
+        try:
+            if item["defender_status"] == "undefended":
+                protected_task = self.generate_protected_task(item["task_definition"])
+            else:
+                protected_task = self.update_defender(item["task_definition"])
+        except Exception as e:
+            registration.set_exception(e)
+            raise
+        if protected_task is None:
+            logging.info(f"Protected task could not be generated for {item['service_arn']}")
+            registration.set_result(None)
+            self.add_result(item["cluster"], item["service_arn"], "failed")
+            return
+
+        yield dict(item, protected_task=protected_task, registration=registration, source_hash=source_hash)
+
+    def register_service(self, item):
+        """
+        Register the defended task definition, or reuse an earlier run's revision,
+        and release the services sharing it.
+        """
+        source_hash = item["source_hash"]
+        try:
+            new_task_definition_arn = self.find_protected_revision(
+                item["task_definition"]["family"], source_hash, revision_number(item["service"]["taskDefinition"]))
+            if new_task_definition_arn is not None:
+                logging.info(f"Reusing protected revision {new_task_definition_arn} for {item['service_arn']}")
+            else:
+                new_task_definition_arn = self._aws_conf.register_task_definition(
+                    item["protected_task"], source_hash=source_hash, defender_version=self._prisma_conf.latest_cwp_version)
+        except Exception as e:
+            item["registration"].set_exception(e)
+            raise
+        item["registration"].set_result(new_task_definition_arn)
+        if new_task_definition_arn is None:
+            self.add_result(item["cluster"], item["service_arn"], "failed")
+            return
+
+        yield dict(item, new_task_definition_arn=new_task_definition_arn)
+
+    def find_protected_revision(self, family: str, source_hash: str, source_revision: int):
+        """
+        Find a revision an earlier run registered for the source hash.
+
+        A protected revision is always registered after its source, so only the
+        revisions newer than the source are read, newest first, until one matches.
+
+        Returns:
+            str: revision ARN, or None when the source must be registered
+        """
+        with self._registrations_lock:
+            revisions = self._family_revisions.get(family)
+            listing = revisions is None
+            if listing:
+                revisions = self._family_revisions[family] = Future()
+        if listing:
+            try:
+                revisions.set_result(self._aws_conf.list_task_definition_revisions(family))
+            except Exception as e:
+                revisions.set_exception(e)
+                raise
+
+        for revision_arn in revisions.result():
+            if revision_number(revision_arn) <= source_revision:
+                break
+            if revision_arn not in self._revision_hashes:
+                self._revision_hashes[revision_arn] = self._aws_conf.get_revision_source_hash(revision_arn)
+            if self._revision_hashes[revision_arn] == source_hash:
+                return revision_arn
+
+        return None
+
+    def follow_registration(self, item, registration) -> None:
+        """
+        Send a service to rollout once the defended revision it shares is registered.
+
+        Runs on the thread that settled the registration, before its stage closes,
+        so the rollout stage is still open.
+        """
+        try:
+            new_task_definition_arn = registration.result()
+            if new_task_definition_arn is None:
+                self.add_result(item["cluster"], item["service_arn"], "failed")
+                return
+            self._rollout.put(dict(item, new_task_definition_arn=new_task_definition_arn))
+        except Exception as e:  # pylint: disable=broad-except
+            self.add_failure(item, e)
+
+    def roll_out_service(self, item):
+        """
+        Point the service at its defended task definition.
+        """
+        cluster, service_arn, new_task_definition_arn = item["cluster"], item["service_arn"], item["new_task_definition_arn"]
+        if self._aws_conf.update_service(cluster, service_arn, new_task_definition_arn) is None:
+            self.add_result(cluster, service_arn, "failed", new_task_definition_arn)
+            return
+        self.record_defended(cluster, service_arn, new_task_definition_arn)
+        self.add_result(cluster, service_arn, "protected" if item["defender_status"] == "undefended" else "updated", new_task_definition_arn)
+
+    def record_defended(self, cluster, service_arn, task_definition_arn) -> None:
+        """
+        Remember a service that now runs the current defender.
+        """
+        if self._state is not None:
+            self._state.record(cluster, service_arn, task_definition_arn, self._prisma_conf.latest_cwp_version)
+
+    def strip_task_definition(self, task_definition) -> dict:
+        """
+        Drop the read-only attributes returned by describe_task_definition.
+        """
+        for attribute in self._prisma_conf._td_removed_attributes:
+            task_definition.pop(attribute, None)
+
+        return task_definition
+
+    def generate_protected_task(self, task_definition):
+        """
+        Build the defended version of an undefended task definition.
+
+        It is rendered locally from the defender template when the entrypoint is
+        known, and Prisma is asked otherwise.
+        """
+        params = dict(self._prisma_conf.fargate_params)
+        image = task_definition['containerDefinitions'][0]['image']
+        logging.debug(f"Image: {image}")
+        extract_entrypoint = not 'entryPoint' in task_definition['containerDefinitions'][0]
+        renderer = self._prisma_conf.protected_task_renderer
+        if not extract_entrypoint and renderer is not None and renderer.ready:
+            protected_task = renderer.render(self.strip_task_definition(task_definition))
+            if protected_task is not None:
+                logging.info(f"Protected task for {task_definition.get('family')} rendered locally")
+
+                return self.clean_protected_task(protected_task)
+        if extract_entrypoint:
+            registry_credential_id = self._registry_credential_id
+            # the registry index is only consulted when its answer changes the credential
+            if not registry_credential_id and self._registry_type == "aws" and not self._prisma_conf.check_image_in_registry(image):
+                registry_credential_id = image.split('.')[0]
+            params["extractEntrypoint"] = extract_entrypoint
+            params["registryCredentialID"] = registry_credential_id
+
+        self.strip_task_definition(task_definition)
+        protected_task = self._prisma_conf.generate_protected_task(params, json.dumps(task_definition, indent=4, sort_keys=True, default=str))
+        logging.debug(f"protected_task: {protected_task}")
+        if protected_task is None:
+            return None
+
+        return self.clean_protected_task(protected_task)
+
+    def clean_protected_task(self, protected_task) -> dict:
+        """
+        Drop the null log configuration Prisma puts on the defender sidecar.
+        """
+        for container in protected_task["containerDefinitions"]:
+            if container["name"] == "TwistlockDefender" and container.get("logConfiguration", False) is None:
+                del container["logConfiguration"]
+
+        return protected_task
+
+    def update_defender(self, task_definition) -> dict:
+        """
+        Point the defender sidecar at the latest image and install bundle.
+        """
+        for container in task_definition["containerDefinitions"]:
+            if container["name"] != "TwistlockDefender":
+                continue
+            for object in container["environment"]:
+                if object["name"] == "INSTALL_BUNDLE":
+                    object["value"] = self._prisma_conf.updated_fargate_bundle
+            container["image"] = self._prisma_conf.updated_fargate_image
+
+        return self.strip_task_definition(task_definition)
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+def resolve_stage_workers(max_workers: int, stage_workers=None) -> dict:
+    """
+    Resolve the workers of every pipeline stage.
+
+    Args:
+        max_workers (int): workers of the read and Prisma stages
+        stage_workers (dict, optional): workers per stage overriding the defaults
+
+    Returns:
+        dict: workers per stage
+    """
+    max_workers = max(1, int(max_workers))
+    # mutations are rate limited by ECS, so they get fewer workers by default
+    resolved = {
+        "discover": max_workers,
+        "classify": max_workers,
+        "protect": max_workers,
+        "register": max(1, max_workers // 2),
+        "rollout": max(1, max_workers // 2),
+    }
+    resolved.update(stage_workers or {})
+
+    return resolved
+
+
+def protection_hash(task_definition: dict, defender_version: str) -> str:
+    """
+    Hash a source task definition, stripped of its read-only attributes, with the
+    defender version it is protected with.
+
+    Args:
+        task_definition (dict): source task definition
+        defender_version (str): defender version
+
+    Returns:
+        str: hex digest
+    """
+    content = json.dumps(task_definition, sort_keys=True, default=str)
+
+    return hashlib.sha256(f"{content}|{defender_version}".encode("utf-8")).hexdigest()
+
+
+def account_failure(account_id, error) -> dict:
+    """
+    Build the report entry for an account that could not be swept at all.
+
+    Args:
+        account_id (str): account ID, None for the home account
+        error (Exception): why the account was skipped
+
+    Returns:
+        dict: report entry
+    """
+    return dict({
+        "account": account_id,
+        "region": None,
+        "cluster": None,
+        "service": None,
+        "status": "failed",
+        "taskDefinition": None,
+    }, **error_details(error))
+
+
+def error_details(error) -> dict:
+    """
+    Describe an error for the report, with the AWS error code when it has one.
+
+    Args:
+        error (Exception): error
+
+    Returns:
+        dict: error message, and errorCode for AWS client errors
+    """
+    details = {"error": str(error)}
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+    if code:
+        details["errorCode"] = code
+
+    return details
+
+
+def revision_number(task_definition_arn: str) -> int:
+    """
+    Read the revision from a task definition ARN, 0 when it names no revision.
+    """
+    revision = task_definition_arn.rsplit("/", 1)[-1].rpartition(":")[2]
+
+    return int(revision) if revision.isdigit() else 0
+
+
+def summarize_report(report: list) -> dict:
+    """
+    Count sweep report entries by status.
+
+    Args:
+        report (list): sweep report entries
+
+    Returns:
+        dict: status counts
+    """
+    counts = {}
+    for result in report:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    return counts
+
+
+def run_sweeps(sweeps: list, max_workers=4) -> list:
+    """
+    Run independent sweeps (one per account and region) concurrently and merge their reports.
+
+    Total runtime follows the slowest sweep rather than the sum of them.
+
+    Args:
+        sweeps (list): Sweep instances
+        max_workers (int): sweeps running at the same time
+
+    Returns:
+        list: merged report
+    """
+    def run_sweep(sweep):
+        try:
+            return sweep.run()
+        except Exception as e:  # pylint: disable=broad-except
+            sweep.add_target_failure(e)
+
+            return sweep.report
+
+    if len(sweeps) == 1:
+        return run_sweep(sweeps[0])
+
+    report = []
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        futures = {pool.submit(run_sweep, sweep): sweep for sweep in sweeps}
+        for future, sweep in futures.items():
+            result = future.result()
+            logging.info("Sweep of %s finished: %s", sweep.target, summarize_report(result))
+            report.extend(result)
+
+    return report
@@ -0,0 +1,123 @@
+# pylint: disable=line-too-long
+"""
+Helper file to abstract Prisma token handling from scripts.
+
+Tokens are cached at module scope so that warm Lambda containers reuse them, and
+are refreshed ahead of the `exp` claim in the JWT instead of after a 401.
+"""
+import os
+import time
+import logging
+import threading
+from implementation_functions.prisma_implementation_functions import (
+    prisma_get_token_expiry
+)
+
+
+class TokenManager():
+    """
+    This class caches login responses per realm and shares refreshes between threads.
+    """
+
+    def __init__(
+        self,
+        refresh_margin=120,
+        default_lifetime=600,
+    ):
+        self._refresh_margin = refresh_margin
+        self._default_lifetime = default_lifetime
+        self._tokens = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    ################################################################################
+    # region member props
+    ################################################################################
+    @property
+    def refresh_margin(self):
+        """
+        refresh_margin member property
+
+        Returns:
+        int: refresh_margin
+        """
+        return self._refresh_margin
+    ################################################################################
+    # endregion member props
+    ################################################################################
+
+    ################################################################################
+    # region member functions
+    ################################################################################
+    def key_lock(self, key) -> threading.Lock:
+        """
+        Return the lock that serializes logins for one key.
+        """
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def is_fresh(self, key, token=None) -> bool:
+        """
+        Check if the cached token for the key is valid past the refresh margin.
+
+        When a token is given, it must also still be the cached one.
+        """
+        entry = self._tokens.get(key)
+        if entry is None:
+            return False
+        if token is not None and entry["token"] != token:
+            return False
+
+        return time.time() < entry["expires_at"] - self._refresh_margin
+
+    def get_login(self, key, login, stale_token=None):
+        """
+        Return the cached login response for the key, logging in when needed.
+
+        Args:
+            key (tuple): realm, endpoint and access key
+            login (Callable): performs the login and returns its response, or None
+            stale_token (str, optional): token the caller knows to be rejected
+
+        Returns:
+            dict: login response
+        """
+        entry = self._tokens.get(key)
+        if entry is not None and entry["token"] != stale_token and self.is_fresh(key):
+            return entry["response"]
+
+        with self.key_lock(key):
+            # another thread may have logged in while we waited
+            entry = self._tokens.get(key)
+            if entry is not None and entry["token"] != stale_token and self.is_fresh(key):
+                return entry["response"]
+
+            response = login()
+            if response is None:
+                return None
+
+            expires_at = prisma_get_token_expiry(response["token"])
+            if expires_at is None:
+                expires_at = time.time() + self._default_lifetime
+            self._tokens[key] = {
+                "token": response["token"],
+                "expires_at": expires_at,
+                "response": response,
+            }
+            logging.info("Prisma %s token refreshed, valid for %ss.", key[0], int(expires_at - time.time()))
+
+            return response
+
+    def invalidate(self, key) -> None:
+        """
+        Forget the cached token for the key.
+        """
+        self._tokens.pop(key, None)
+    ################################################################################
+    # endregion member functions
+    ################################################################################
+
+
+TOKEN_MANAGER = TokenManager(
+    refresh_margin=int(os.environ.get("PRISMA_TOKEN_REFRESH_MARGIN", "120")),
+)
@@ -6,6 +6,8 @@ This file contains a collection of Prisma helper functions for automating tasks.
 Functions:
 - aws_initiate_secrets_manager_client()
 - aws_secrets_manager_get_secret()
+- aws_secrets_manager_batch_get_secrets()
+- aws_secrets_manager_get_current_version()
 
 Usage:
 - Simply import this file and call the function. For example:
@@ -20,45 +22,131 @@ import boto3
 import logging
 import datetime
 from typing import Optional
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import AssumeRoleCredentialFetcher, DeferredRefreshableCredentials, JSONFileCache
 from botocore.exceptions import ClientError
 
-def aws_initiate_session():
+ECS_DESCRIBE_SERVICES_LIMIT = 10
+ECS_LIST_PAGE_SIZE = 100
+ECS_DESCRIBE_CLUSTERS_LIMIT = 100
+SECRETS_MANAGER_BATCH_GET_LIMIT = 20
+# ECS attempts per call; throttled mutations are retried with backoff before they fail
+ECS_MAX_ATTEMPTS = 8
+# tags that identify a protected revision: the hash of its source task definition
+# and defender version, and the defender version alone
+DEFENDER_SOURCE_HASH_TAG = "prisma-defender:source-hash"
+DEFENDER_VERSION_TAG = "prisma-defender:version"
+# error codes with which AWS APIs report throttling
+THROTTLING_ERROR_CODES = ("Throttling", "ThrottlingException", "ThrottledException", "TooManyRequestsException", "RequestLimitExceeded")
+
+def aws_initiate_session(data_loader=None):
     """
     Initiate the AWS Session.
 
+    Args:
+        data_loader (botocore.loaders.Loader, optional): replaces botocore's model loader
+
     Returns:
         AWS Session
     """
+    botocore_session = botocore.session.Session()
+    if data_loader is not None:
+        botocore_session.register_component("data_loader", data_loader)
 
-    session = boto3.session.Session()
+    session = boto3.session.Session(botocore_session=botocore_session)
     return session
 
+def aws_initiate_assumed_role_session(
+        session, role_arn: str, cache_dir: str, external_id: Optional[str] = None,
+        role_session_name: str = "prisma-fargate-defender", data_loader=None
+):
+    """
+    Initiate an AWS Session that assumes a role in another account.
+
+    Credentials are fetched on first use, refreshed before expiry and kept in a
+    JSON file cache so warm containers can reuse them.
+
+    Returns:
+        AWS Session
+    """
+    extra_args = {"RoleSessionName": role_session_name}
+    if external_id:
+        extra_args["ExternalId"] = external_id
+    source_session = session._session  # pylint: disable=protected-access
+    fetcher = AssumeRoleCredentialFetcher(
+        client_creator=source_session.create_client,
+        source_credentials=source_session.get_credentials(),
+        role_arn=role_arn,
+        extra_args=extra_args,
+        cache=JSONFileCache(cache_dir),
+    )
+    assumed_session = botocore.session.Session()
+    if data_loader is not None:
+        assumed_session.register_component("data_loader", data_loader)
+    assumed_session._credentials = DeferredRefreshableCredentials(  # pylint: disable=protected-access
+        method="assume-role",
+        refresh_using=fetcher.fetch_credentials,
+    )
+
+    return boto3.session.Session(botocore_session=assumed_session)
+
 def aws_initiate_secrets_manager_client(
-         session, region: Optional[str] = ""
+         session, region: Optional[str] = "", max_pool_connections: Optional[int] = None
 ):
     """
     Initiate the AWS Secret Manager client.
 
+    Retries use botocore's adaptive mode, whose client-side rate limiter backs
+    off when Secrets Manager throttles, so concurrent rotations need no pauses.
+
     Returns:
         AWS Secret Manager Client
     """
+    config = Config(retries={"mode": "adaptive", "max_attempts": 10})
+    if max_pool_connections:
+        config = config.merge(Config(max_pool_connections=max_pool_connections))
     client = session.client(
         service_name='secretsmanager',
-        region_name=region
+        region_name=region,
+        config=config
     )
     return client
 
 def aws_initiate_ecs_client(
-        session, region: Optional[str] = ""
+        session, region: Optional[str] = "", max_pool_connections: Optional[int] = None, max_attempts: int = ECS_MAX_ATTEMPTS
 ):
     """
-    Initiate the AWS Secret Manager client.
+    Initiate the AWS ECS client.
+
+    The client is shared by the sweep workers, so its connection pool should be
+    at least as large as the number of concurrent workers. Retries use botocore's
+    standard mode; mutations are additionally paced by a MutationScheduler.
 
     Returns:
-        AWS Secret Manager Client
+        AWS ECS Client
     """
+    config = Config(retries={"mode": "standard", "max_attempts": max_attempts})
+    if max_pool_connections:
+        config = config.merge(Config(max_pool_connections=max_pool_connections))
     client = session.client(
         service_name='ecs',
+        region_name=region,
+        config=config
+    )
+    return client
+
+def aws_initiate_ec2_client(
+        session, region: Optional[str] = ""
+):
+    """
+    Initiate the AWS EC2 client.
+
+    Returns:
+        AWS EC2 Client
+    """
+    client = session.client(
+        service_name='ec2',
         region_name=region
     )
     return client
@@ -116,6 +204,27 @@ def aws_lambda_get_function(function_name: str, client, debug_mode: bool) -> dic
 
     return response
 
+def aws_ec2_get_regions(client, debug_mode: bool) -> list:
+    """
+    Get the regions enabled for the account
+
+    Args:
+        client: AWS EC2 client
+
+    Raises:
+        ex: Client Error
+
+    Returns:
+        list: region names
+    """
+    if debug_mode:
+        logging.debug(
+            "API READ_REQUEST \u2713: sending the request through."
+        )
+    response = client.describe_regions(AllRegions=False)
+
+    return sorted(region['RegionName'] for region in response['Regions'])
+
 def aws_ecs_get_clusters(client, debug_mode: bool) -> list:
     """
     Get all ECS clusters
@@ -124,7 +233,7 @@ def aws_ecs_get_clusters(client, debug_mode: bool) -> list:
         client: AWS ECS client
 
     Raises:
-        ex: Client Error
+        ClientError: the clusters could not be listed
 
     Returns:
         object: List of all ECS clusters
@@ -133,10 +242,11 @@ def aws_ecs_get_clusters(client, debug_mode: bool) -> list:
         logging.debug(
             "API READ_REQUEST \u2713: sending the request through."
         )
+    response = []
     try:
         clusters = []
         paginator = client.get_paginator('list_clusters')
-        for page in paginator.paginate():
+        for page in paginator.paginate(PaginationConfig={'PageSize': ECS_LIST_PAGE_SIZE}):
             clusters.extend(page['clusterArns'])
         response=clusters
         logging.info("All ECS Clusters retrieved.")
@@ -144,6 +254,8 @@ def aws_ecs_get_clusters(client, debug_mode: bool) -> list:
     except ClientError as e:
         if e.response['Error']['Code'] == 'ResourceNotFoundException':
             logging.info("No clusters were found")
+
+            return response
         elif e.response['Error']['Code'] == 'InvalidRequestException':
             logging.info("The request was invalid due to: %s", e)
         elif e.response['Error']['Code'] == 'InvalidParameterException':
@@ -153,35 +265,83 @@ def aws_ecs_get_clusters(client, debug_mode: bool) -> list:
                 "The requested secret can't be decrypted using the provided KMS key: %s", e)
         elif e.response['Error']['Code'] == 'InternalServiceError':
             logging.info("An error occurred on service side: %s", e)
+        else:
+            logging.info("Listing clusters failed: %s", e)
+        # an empty list would read as a clean sweep
+        raise
+
+    return response
+
+def aws_ecs_describe_clusters(cluster_arns: list, client, debug_mode: bool) -> dict:
+    """
+    Describe ECS clusters with their statistics, batched by the ECS describe limit
+    Args:
+        client: AWS ECS client
+        cluster_arns: Cluster ARNs
+    Raises:
+        ex: Client Error
+
+    Returns:
+        dict: {"clusters": {arn: cluster}, "failures": {arn: failure}}
+    """
+    if debug_mode:
+        logging.debug(
+            "API READ_REQUEST \u2713: sending the request through."
+        )
+    response = {"clusters": {}, "failures": {}}
+    for index in range(0, len(cluster_arns), ECS_DESCRIBE_CLUSTERS_LIMIT):
+        batch = cluster_arns[index:index + ECS_DESCRIBE_CLUSTERS_LIMIT]
+        try:
+            page = client.describe_clusters(clusters=batch, include=['STATISTICS'])
+        except ClientError as e:
+            logging.info("Describing clusters failed: %s", e)
+            for cluster_arn in batch:
+                response["failures"][cluster_arn] = {
+                    "arn": cluster_arn,
+                    "reason": e.response['Error']['Code'],
+                }
+            continue
+
+        for cluster in page.get('clusters', []):
+            response["clusters"][cluster['clusterArn']] = cluster
+        for failure in page.get('failures', []):
+            response["failures"][failure['arn']] = failure
 
     return response
 
-def aws_ecs_get_services(cluster_name: str, client, debug_mode: bool):
+def aws_ecs_get_services(cluster_name: str, client, debug_mode: bool, launch_type: Optional[str] = None):
     """
     Retrieve all services within a specified ECS cluster
     Args:
         client: AWS ECS client
-        layer_arn: AWS Layer Arn
+        cluster_name: Cluster Name
+        launch_type: only list services with this launch type (FARGATE, EC2 or EXTERNAL).
+            Services using a capacity provider strategy have no launch type and are
+            only returned without the filter.
     Raises:
         ex: Client Error
 
     Returns:
-        object: Lambda twistlock layer
+        list: service ARNs
     """
     if debug_mode:
         logging.debug(
             "API READ_REQUEST \u2713: sending the request through."
         )
+    response = []
     try:
         services = []
         paginator = client.get_paginator('list_services')
-        for page in paginator.paginate(cluster=cluster_name):
+        filters = {'launchType': launch_type} if launch_type else {}
+        for page in paginator.paginate(cluster=cluster_name, PaginationConfig={'PageSize': ECS_LIST_PAGE_SIZE}, **filters):
             services.extend(page['serviceArns'])
             response=services
 
     except ClientError as e:
         if e.response['Error']['Code'] == 'ResourceNotFoundException':
             logging.info("No services were found")
+
+            return response
         elif e.response['Error']['Code'] == 'InvalidRequestException':
             logging.info("The request was invalid due to: %s", e)
         elif e.response['Error']['Code'] == 'InvalidParameterException':
@@ -191,6 +351,10 @@ def aws_ecs_get_services(cluster_name: str, client, debug_mode: bool):
                 "The requested secret can't be decrypted using the provided KMS key: %s", e)
         elif e.response['Error']['Code'] == 'InternalServiceError':
             logging.info("An error occurred on service side: %s", e)
+        else:
+            logging.info("Listing services failed: %s", e)
+        # an empty list would read as a clean sweep
+        raise
 
     return response
 
@@ -228,6 +392,48 @@ def aws_ecs_get_service_desc(service_arn, cluster_name, client, debug_mode: bool
 
     return response
 
+def aws_ecs_get_service_descs(service_arns: list, cluster_name, client, debug_mode: bool) -> dict:
+    """
+    Get service descriptions for many services, batched by the ECS describe limit
+    Args:
+        client: AWS ECS client
+        service_arns: Service ARNs
+        cluster_name: Cluster Name
+    Raises:
+        ex: Client Error
+
+    Returns:
+        dict: {"services": {arn: service}, "failures": {arn: failure}}
+    """
+    if debug_mode:
+        logging.debug(
+            "API READ_REQUEST \u2713: sending the request through."
+        )
+    response = {"services": {}, "failures": {}}
+    for index in range(0, len(service_arns), ECS_DESCRIBE_SERVICES_LIMIT):
+        batch = service_arns[index:index + ECS_DESCRIBE_SERVICES_LIMIT]
+        try:
+            page = client.describe_services(cluster=cluster_name, services=batch)
+        except ClientError as e:
+            logging.info("Describing services in %s failed: %s", cluster_name, e)
+            for service_arn in batch:
+                response["failures"][service_arn] = {
+                    "arn": service_arn,
+                    "reason": e.response['Error']['Code'],
+                }
+            continue
+
+        for service in page.get('services', []):
+            response["services"][service['serviceArn']] = service
+        for failure in page.get('failures', []):
+            response["failures"][failure['arn']] = failure
+
+    logging.info(
+        "Described %s services in %s (%s failures).",
+        len(response["services"]), cluster_name, len(response["failures"]))
+
+    return response
+
 def aws_ecs_is_fargate_service(service_desc, debug_mode: bool):
     """
     Check to see if Service is Fargate Service
@@ -250,7 +456,7 @@ def aws_ecs_is_fargate_service(service_desc, debug_mode: bool):
         for service in service_desc['services']:
             if 'capacityProviderStrategy' in service:
                 for capacityProviderStrategy in service['capacityProviderStrategy']:
-                    if capacityProviderStrategy['capacityProvider'] == 'FARGATE' and capacityProviderStrategy['weight'] > 0:
+                    if capacityProviderStrategy['capacityProvider'] in ('FARGATE', 'FARGATE_SPOT') and capacityProviderStrategy['weight'] > 0:
                         response = True
             
             elif 'launchType' in service:
@@ -259,35 +465,85 @@ def aws_ecs_is_fargate_service(service_desc, debug_mode: bool):
 
     return service, response
     
-def aws_ecs_get_fargate_defender_status(latest_version, task_definition_arn, client, debug_mode: bool):
+def aws_ecs_is_task_definition_revision_arn(task_definition_arn: str) -> bool:
     """
-    Check to see if Fargate Service is defended, outdated, or not
+    Check if a task definition reference is a full revision ARN.
+
+    Revision ARNs are immutable in ECS, so only they are safe to cache.
+    """
+    return task_definition_arn.startswith("arn:") and ":" in task_definition_arn.rsplit("/", 1)[-1]
+
+def aws_ecs_describe_task_definition(task_definition_arn, client, debug_mode: bool, cache=None) -> dict:
+    """
+    Describe a task definition with its tags.
+
     Args:
-        client: AWS ECS client
         task_definition_arn: task_definition ARN
+        client: AWS ECS client
+        cache: optional description cache keyed by revision ARN
+
     Raises:
         ex: Client Error
 
     Returns:
-        String - defended/outdated/undefended
+        dict: taskDefinition and tags
     """
     if debug_mode:
         logging.debug(
             "API READ_REQUEST \u2713: sending the request through."
         )
+    cacheable = cache is not None and aws_ecs_is_task_definition_revision_arn(task_definition_arn)
+    description = cache.get(task_definition_arn) if cacheable else None
+    if description is None:
+        try:
+            task_definition_desc = client.describe_task_definition(taskDefinition=task_definition_arn, include=["TAGS"])
+        except ClientError as e:
+            if e.response['Error']['Code'] != "AccessDeniedException":
+                raise
+            # reading tags needs ecs:ListTagsForResource, the description itself does not
+            logging.info("Tags of %s denied, describing it without tags.", task_definition_arn)
+            task_definition_desc = client.describe_task_definition(taskDefinition=task_definition_arn)
+        description = {
+            "taskDefinition": task_definition_desc['taskDefinition'],
+            "tags": task_definition_desc.get('tags', []),
+        }
+        if cacheable:
+            cache.put(task_definition_arn, description)
+
+    return description
+
+def aws_ecs_get_fargate_defender_status(latest_version, task_definition_arn, client, debug_mode: bool, cache=None):
+    """
+    Check to see if Fargate Service is defended, outdated, or not
+
+    Revisions registered by the sweep carry their defender version in a tag,
+    read when the defender container is present; older revisions use the
+    version in the defender image.
+
+    Args:
+        client: AWS ECS client
+        task_definition_arn: task_definition ARN
+        cache: optional description cache keyed by revision ARN
+    Raises:
+        ex: Client Error
+
+    Returns:
+        String - defended/outdated/undefended
+    """
+    task_definition = None
     try:
         response = "undefended"
-        task_definition_desc = client.describe_task_definition(taskDefinition=task_definition_arn)
-        task_definition = task_definition_desc['taskDefinition']
-
+        description = aws_ecs_describe_task_definition(task_definition_arn, client, debug_mode, cache=cache)
+        task_definition = description['taskDefinition']
         for container in task_definition['containerDefinitions']:
             if container['name'] == "TwistlockDefender":
-                defender_version = container["image"][-9:]               
-                if defender_version == latest_version:
+                # the tag only counts while the defender container is still there
+                defender_version = aws_ecs_tags_to_dict(description['tags']).get(DEFENDER_VERSION_TAG) or container["image"][-9:]
+                if defender_version is not None and defender_version == latest_version:
                     response = "defended"
                 else:
                     response = "outdated"
-                    logging.info(f"Current Defender Version is {defender_version}, the newest version is {latest_version}. Initiating update...")                   
+                    logging.info(f"Current Defender Version is {defender_version}, the newest version is {latest_version}. Initiating update...")
                 break
 
     except ClientError as e:
@@ -303,51 +559,145 @@ def aws_ecs_get_fargate_defender_status(latest_version, task_definition_arn, cli
             elif e.response['Error']['Code'] == 'InternalServiceError':
                 logging.info("An error occurred on service side: %s", e)
     
-    if response == "undefended":
+    if task_definition is None:
+        response = "failed"
+    elif response == "undefended":
         logging.info("Task definition is not defended, defender deployment starting.")
 
     return task_definition, response
 
-def aws_ecs_register_task_definition(task_definition: str, client, debug_mode: bool):
+def aws_ecs_list_task_definition_revisions(family: str, client, debug_mode: bool, limit: int) -> list:
     """
-    Register a new ECS task definition
+    List the newest active revisions of a task definition family.
+
     Args:
-        client: AWS Client client
-        layer_arn: AWS Layer Arn
+        family (str): task definition family
+        client: AWS ECS client
+        limit (int): revisions to list
+
+    Returns:
+        list: revision ARNs, newest first
+    """
+    if debug_mode:
+        logging.debug(
+            "API READ_REQUEST \u2713: sending the request through."
+        )
+    revisions = []
+    try:
+        paginator = client.get_paginator('list_task_definitions')
+        pages = paginator.paginate(
+            familyPrefix=family,
+            status='ACTIVE',
+            sort='DESC',
+            PaginationConfig={'PageSize': min(limit, ECS_LIST_PAGE_SIZE)}
+        )
+        for page in pages:
+            # familyPrefix also matches longer family names
+            revisions.extend(arn for arn in page['taskDefinitionArns'] if arn.rsplit("/", 1)[-1].rsplit(":", 1)[0] == family)
+            if len(revisions) >= limit:
+                break
+    except ClientError as e:
+        if is_throttling_error(e):
+            raise
+        logging.info("Revisions of task definition family %s could not be listed: %s", family, e)
+
+    return revisions[:limit]
+
+def aws_ecs_get_tags(resource_arn: str, client, debug_mode: bool) -> dict:
+    """
+    Get the tags of an ECS resource.
+
+    Args:
+        resource_arn (str): resource ARN
+        client: AWS ECS client
 
     Raises:
-        ex: Client Error
+        ClientError: ECS still throttled the request after the client's retries
 
     Returns:
-        object: Lambda twistlock layer
+        dict: tags, or None when they could not be read
     """
-    """Register a new ECS task definition"""
     if debug_mode:
         logging.debug(
             "API READ_REQUEST \u2713: sending the request through."
         )
     try:
+        response = client.list_tags_for_resource(resourceArn=resource_arn)
+    except ClientError as e:
+        if is_throttling_error(e):
+            raise
+        logging.info("Tags of %s could not be read: %s", resource_arn, e)
+
+        return None
+
+    return aws_ecs_tags_to_dict(response.get('tags', []))
+
+def aws_ecs_tags_to_dict(tags: list) -> dict:
+    """
+    Convert ECS key/value tags to a dict.
+    """
+    return {tag['key']: tag['value'] for tag in tags or []}
+
+def aws_ecs_register_task_definition(task_definition: dict, client, debug_mode: bool, tags=None):
+    """
+    Register a new ECS task definition.
+
+    Args:
+        task_definition (dict): task definition to register
+        client: AWS ECS client
+        debug_mode (bool): debug mode
+        tags (dict, optional): tags for the new revision
+
+    Raises:
+        ClientError: ECS still throttled the request after the client's retries
+
+    Returns:
+        str: ARN of the registered revision, or None on any other error
+    """
+    if debug_mode:
+        logging.debug(
+            "API READ_REQUEST \u2713: sending the request through."
+        )
+    try:
+        if tags:
+            try:
+                response = client.register_task_definition(
+                    **dict(task_definition, tags=[{'key': key, 'value': value} for key, value in tags.items()]))
+                return response['taskDefinition']['taskDefinitionArn']
+            except ClientError as e:
+                if e.response['Error']['Code'] != "AccessDeniedException":
+                    raise
+                # tagging needs ecs:TagResource, registering does not
+                logging.info("Tagging %s denied, registering it without tags.", task_definition.get('family'))
         response = client.register_task_definition(**task_definition)
         return response['taskDefinition']['taskDefinitionArn']
-    
+
+    except ClientError as e:
+        if is_throttling_error(e):
+            raise
+        logging.info(f"Error registering task definition: {e}")
+        return None
     except Exception as e:
         logging.info(f"Error registering task definition: {e}")
         return None
-    
+
 def aws_ecs_update_service(cluster_name: str, service_name :str, new_task_definition: str, client, debug_mode: bool):
     """
-    Register a new ECS task definition
+    Point an ECS service at a task definition revision.
+
     Args:
-        client: AWS Client client
-        layer_arn: AWS Layer Arn
+        cluster_name (str): cluster name or ARN
+        service_name (str): service name or ARN
+        new_task_definition (str): task definition ARN
+        client: AWS ECS client
+        debug_mode (bool): debug mode
 
     Raises:
-        ex: Client Error
+        ClientError: ECS still throttled the request after the client's retries
 
     Returns:
-        object: Lambda twistlock layer
+        dict: update_service response, or None on any other error
     """
-    """Register a new ECS task definition"""
     if debug_mode:
         logging.debug(
             "API READ_REQUEST \u2713: sending the request through."
@@ -359,10 +709,21 @@ def aws_ecs_update_service(cluster_name: str, service_name :str, new_task_defini
             taskDefinition=new_task_definition
         )
         return response
+    except ClientError as e:
+        if is_throttling_error(e):
+            raise
+        logging.info(f"Error updating service: {e}")
+        return None
     except Exception as e:
         logging.info(f"Error updating service: {e}")
         return None
-    
+
+def is_throttling_error(error: ClientError) -> bool:
+    """
+    Check if a ClientError is AWS throttling the caller.
+    """
+    return error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
 def aws_lambda_update_function(function_name: str, layer_arn, client, debug_mode: bool) -> dict:
     """
     Get twistlock layer from AWS Lambda
@@ -488,6 +849,77 @@ def aws_secrets_manager_get_secret(client, secret_name: str, debug_mode: bool) -
 
     return response
 
+def aws_secrets_manager_batch_get_secrets(client, secret_names: list, debug_mode: bool) -> dict:
+    """
+    Get several secrets from AWS Secret Manager with BatchGetSecretValue,
+    up to 20 per request.
+
+    Args:
+        client: AWS Secret Manager client
+        secret_names (list): Secret Names or ARNs
+
+    Raises:
+        ex: Client Error
+
+    Returns:
+        dict: secret value per requested name, and the error per secret that could not be read
+    """
+    results = {"secrets": {}, "errors": {}}
+    for offset in range(0, len(secret_names), SECRETS_MANAGER_BATCH_GET_LIMIT):
+        chunk = secret_names[offset:offset + SECRETS_MANAGER_BATCH_GET_LIMIT]
+        if debug_mode:
+            logging.debug(
+                "API READ_REQUEST \u2713: sending the request through."
+            )
+        try:
+            response = client.batch_get_secret_value(
+                SecretIdList=chunk
+            )
+        except ClientError as ex:
+            # For a list of exceptions thrown, see
+            # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_BatchGetSecretValue.html
+            raise ex
+
+        for secret in response.get("SecretValues", []):
+            # key by the identifier that was asked for, which may be the name or the ARN
+            secret_name = next((name for name in chunk if name in (secret.get("Name"), secret.get("ARN"))), secret.get("Name"))
+            results["secrets"][secret_name] = secret
+        for error in response.get("Errors", []):
+            results["errors"][error.get("SecretId")] = error
+
+    return results
+
+def aws_secrets_manager_get_current_version(client, secret_name: str, debug_mode: bool) -> str:
+    """
+    Get the AWSCURRENT version ID of a secret without reading its value.
+
+    Args:
+        client: AWS Secret Manager client
+        secret_name (str): Secret Name
+
+    Raises:
+        ex: Client Error
+
+    Returns:
+        str: Version ID, or None if no version is current
+    """
+    if debug_mode:
+        logging.debug(
+            "API READ_REQUEST \u2713: sending the request through."
+        )
+    try:
+        response = client.describe_secret(
+            SecretId=secret_name
+        )
+    except ClientError as ex:
+        raise ex
+
+    for version_id, stages in response.get("VersionIdsToStages", {}).items():
+        if "AWSCURRENT" in stages:
+            return version_id
+
+    return None
+
 def aws_secrets_manager_update_secret_value(client, secret_name: str, secret_value: str, debug_mode: bool) -> bool:
     """
     Update secret in AWS Secret Manager
@@ -4,6 +4,11 @@ TODO: update docstring
 This file contains a collection of Prisma helper functions for automating tasks.
 
 Functions:
+- prisma_get_session()
+- prisma_get_token_expiry(token)
+- prisma_open_connection(endpoint)
+- prisma_get_registry(token, cwp_endpoint, offset, limit, debug_mode)
+- prisma_normalize_image(image)
 - prisma_cspm_login(access_key, secret_key, cspm_endpoint, debug_mode)
 
 
@@ -16,11 +21,90 @@ Notes:
 - Before using these functions, be sure to configure the .env appropriately.
 
 """
+import os
 import json
+import base64
 import logging
+import threading
 from typing import Tuple, Any
 import requests
+from requests.adapters import HTTPAdapter
 
+PRISMA_POOL_SIZE = int(os.environ.get("PRISMA_POOL_SIZE", "16"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def prisma_initiate_session(pool_size: int = PRISMA_POOL_SIZE) -> requests.Session:
+    """
+    Initiate a keep-alive HTTP session for the Prisma APIs.
+
+    Parameters:
+        pool_size (int): connections kept open per Prisma host
+
+    Returns:
+        requests.Session: pooled session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+    session.mount("https://", adapter)
+
+    return session
+
+def prisma_get_session() -> requests.Session:
+    """
+    Return the module-wide Prisma session, creating it on first use.
+
+    The session lives at module scope so warm Lambda containers keep their
+    connections (and TLS sessions) to the CSPM and CWP consoles.
+
+    Returns:
+        requests.Session: pooled session
+    """
+    global _session  # pylint: disable=global-statement
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = prisma_initiate_session()
+
+    return _session
+
+
+def prisma_get_token_expiry(token: str):
+    """
+    Read the `exp` claim of a Prisma JWT without verifying it.
+
+    Parameters:
+        token (str): Prisma token
+
+    Returns:
+        float: expiry as a unix timestamp, or None if the token has no readable claim
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def prisma_open_connection(endpoint: str, timeout: int = 5) -> int:
+    """
+    Open a pooled connection (TCP + TLS) to a Prisma host ahead of the first API call.
+
+    Parameters:
+        endpoint (str): Prisma API endpoint, only its host is used
+        timeout (int): seconds to wait for the host
+
+    Returns:
+        int: response status code
+    """
+    host = endpoint.split("/", 1)[0]
+    response = prisma_get_session().head(f"https://{host}/", timeout=timeout)
+
+    return response.status_code
 
 def prisma_cspm_login(
     access_key: str,
@@ -61,7 +145,7 @@ def prisma_cspm_login(
 
     body = {"username": access_key, "password": secret_key}
 
-    response = requests.post(
+    response = prisma_get_session().post(
         endpoint, headers=headers, json=body, timeout=360
     )
 
@@ -114,7 +198,7 @@ def prisma_cwp_login(
 
     body = {"username": access_key, "password": secret_key}
 
-    response = requests.post(
+    response = prisma_get_session().post(
         endpoint, headers=headers, json=body, timeout=360
     )
 
@@ -163,7 +247,7 @@ def prisma_get_expired_serverless_defenders(
         "Authorization": "Bearer "+ token,
     }
 
-    response = requests.get(
+    response = prisma_get_session().get(
         endpoint, headers=headers, timeout=60
     )
 
@@ -215,7 +299,7 @@ def prisma_get_serverless_defender_zip(
 
     data = '{{"provider": "aws", "runtime": "{}"}}'.format((runtime))
 
-    response = requests.post(
+    response = prisma_get_session().post(
         endpoint, headers=headers, data=data, timeout=60
     )
 
@@ -271,7 +355,7 @@ def prisma_add_access_key(
         "x-redlock-auth": token,
     }
 
-    response = requests.post(
+    response = prisma_get_session().post(
         endpoint, headers=headers, json=payload, timeout=60
     )
 
@@ -280,12 +364,12 @@ def prisma_add_access_key(
     else:
         return response.text, response.status_code
 
-def prisma_check_image_in_registry(
-    image, token: str, cwp_endpoint: str, debug_mode=False
+def prisma_get_registry(
+    token: str, cwp_endpoint: str, offset: int = 0, limit: int = 50, debug_mode=False
 ) -> Tuple[Any, int]:
     """
-    Return true in task_definitions image is in registry scan
-    
+    Returns one page of registry scan results in compact form.
+
     https://pan.dev/prisma-cloud/api/cwpp/get-registry/
 
     In debug mode,
@@ -294,15 +378,18 @@ def prisma_check_image_in_registry(
     Parameters:
         token (str): Prisma token for authentication
         cwp_endpoint (str): Runtime Security Management API endpoint
+        offset (int): first result to return
+        limit (int): page size, at most 50
         debug_mode (bool): Debug enabled or disabled
 
     Returns:
-        list: expired serverless defenders
-
+        Tuple[list, int]:
+            list: registry scan results
+            int: response status code
     """
-    endpoint = f"https://{cwp_endpoint}/registry?compact=true&search={image}"
+    endpoint = f"https://{cwp_endpoint}/registry"
 
-    logging.info("Checking if image exist in registry with %s", endpoint)
+    logging.info("Getting registry scan results from %s (offset %s)", endpoint, offset)
 
     if debug_mode:
         logging.info(
@@ -315,15 +402,14 @@ def prisma_check_image_in_registry(
         "Authorization": "Bearer "+ token,
     }
 
-    response = requests.get(
-        endpoint, headers=headers, timeout=60
+    params = {"compact": "true", "offset": offset, "limit": limit}
+
+    response = prisma_get_session().get(
+        endpoint, headers=headers, params=params, timeout=60
     )
 
     if response.status_code == 200:
-        if response.text:
-            return True, response.status_code
-        else:
-            return False, response.status_code
+        return json.loads(response.text) or [], response.status_code
     else:
         logging.info(
             "Prisma API returned: %s - %s", response.status_code, response.text
@@ -331,6 +417,54 @@ def prisma_check_image_in_registry(
 
         return None, response.status_code
 
+def prisma_normalize_image(image: str) -> str:
+    """
+    Normalize an image reference to `registry/repo:tag`.
+
+    Docker Hub references get their implicit registry, `library/` namespace and
+    `latest` tag filled in, and digests are dropped.
+
+    Parameters:
+        image (str): image reference as used in a task definition
+
+    Returns:
+        str: normalized image reference
+    """
+    image = image.split("@", 1)[0]
+    registry, _, remainder = image.partition("/")
+    if not remainder or ("." not in registry and ":" not in registry and registry != "localhost"):
+        registry, remainder = "docker.io", image
+    if registry in ("index.docker.io", "registry-1.docker.io"):
+        registry = "docker.io"
+
+    repo, _, tag = remainder.rpartition(":")
+    if not repo or "/" in tag:
+        repo, tag = remainder, "latest"
+    if registry == "docker.io" and "/" not in repo:
+        repo = f"library/{repo}"
+
+    return f"{registry}/{repo}:{tag}"
+
+def prisma_registry_image_keys(entry: dict) -> list:
+    """
+    Return the normalized image references for one registry scan result.
+
+    Parameters:
+        entry (dict): registry scan result
+
+    Returns:
+        list: normalized image references
+    """
+    repo_tags = [entry.get("repoTag") or {}] + (entry.get("tags") or [])
+    keys = []
+    for repo_tag in repo_tags:
+        if not repo_tag.get("repo"):
+            continue
+        registry = repo_tag.get("registry") or "docker.io"
+        keys.append(prisma_normalize_image(f"{registry}/{repo_tag['repo']}:{repo_tag.get('tag') or 'latest'}"))
+
+    return keys
+
 def prisma_generate_protected_task(
     params, task_definition, token: str, cwp_endpoint: str, debug_mode=False
 ):
@@ -368,7 +502,7 @@ def prisma_generate_protected_task(
         "Authorization": "Bearer "+ token,
     }
 
-    response = requests.post(
+    response = prisma_get_session().post(
         endpoint, headers=headers, data=task_definition, params=params, timeout=60
     )
 
@@ -405,7 +539,7 @@ def prisma_get_latest_version(
     }
 
 
-    response = requests.get(
+    response = prisma_get_session().get(
         endpoint, headers=headers, timeout=360
     )
 
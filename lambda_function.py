@@ -24,26 +24,43 @@ Prerequisites:
         and service account credentials/permissions for the automation to work.
     - The Role attached to the Lambda function will need to be provisioned access
         to Secrets Manager for read/write capabilities.
+    - The sweep role tags the task definitions it registers and reads those tags
+        back, which needs ecs:TagResource and ecs:ListTagsForResource. Without
+        them revisions are registered and described untagged, and a rerun
+        cannot reuse the revisions an earlier run registered.
 
 Notes:
 
 """
 import os
+import ast
 import sys
 import logging
 import datetime as dt
 import json
 sys.path.append(".")  # nopep8
-from configurations.code import Configurations
-from configurations.prisma import Prisma
-from configurations.aws import AWS
+from configurations.imports import IMPORT_PROFILER, start_import_profile, lazy_import
+# opt-in: log what each import below costs
+IMPORT_PROFILE = start_import_profile()
+from configurations.runtime import get_runtime_context, reset_runtime_context, prewarm_runtime_context, CREDENTIAL_ERROR_CODES
+from configurations.sweep import Sweep, run_sweeps, summarize_report, account_failure
+from configurations.state import SweepState, FileStateBackend
 
+botocore_exceptions = lazy_import("botocore.exceptions")
+scheduler_module = lazy_import("configurations.scheduler")
 
 if "AWS_LAMBDA_RUNTIME_API" in os.environ:
     LOCAL = False
 else:
     LOCAL = True
 
+# opt-in: build clients and open connections during Lambda's init phase
+if ast.literal_eval(os.environ.get("PREWARM", "False")):
+    PREWARM_TIMINGS = prewarm_runtime_context(LOCAL)
+
+if IMPORT_PROFILE:
+    IMPORT_PROFILER.log_report(limit=int(os.environ.get("IMPORT_PROFILE_LIMIT", "25")))
+
 
 def lambda_handler(event="", context=""):
     """
@@ -57,19 +74,11 @@ def lambda_handler(event="", context=""):
     ################################################################################
     # region init
     ################################################################################
-    code_conf = Configurations(
-        local_run=LOCAL,
-        status_code=0,
-        task="Initializing code configurations",
-        status_text="",
-    )
-    prisma_conf = Prisma(
-        local_run=LOCAL,
-        request_offset=0,
-        request_limit=50,
-        debug_mode=code_conf.debug_mode
-    )
-    aws_conf = AWS(local_run=LOCAL, debug_mode=code_conf.debug_mode)
+    # built once per container and reused by warm invocations
+    runtime_context = get_runtime_context(LOCAL)
+    code_conf = runtime_context.code_conf
+    prisma_conf = runtime_context.prisma_conf
+    aws_conf = runtime_context.aws_conf
     ################################################################################
     # endregion init
     ################################################################################
@@ -79,60 +88,62 @@ def lambda_handler(event="", context=""):
     ################################################################################
     # region get prisma secrets
     ################################################################################
-    prisma_keys = aws_conf.get_prisma_secrets()
+    try:
+        prisma_keys = aws_conf.get_prisma_secrets()
+    except botocore_exceptions.ClientError as e:
+        if e.response['Error']['Code'] in CREDENTIAL_ERROR_CODES:
+            logging.info("AWS credentials rejected, the runtime context will be rebuilt.")
+            reset_runtime_context()
+        raise
     prisma_conf.prisma_access_key = prisma_keys["prisma_access_key"]
     prisma_conf.prisma_secret_key = prisma_keys["prisma_secret_key"]
-    prisma_conf.get_cspm_token()
-    prisma_conf.get_cwp_token()
+    # CSPM and CWP log in lazily, the first time an API of that realm is used
     prisma_conf.get_latest_version()
-    prisma_conf.set_updated_fargate_image_and_bundle()
-    registry_type = ""
-    registry_credentialID = ""
-    
-    # Loop through each cluster and get services and task definitions
-    # Get list of clusters
-    clusters = aws_conf.get_ecs_clusters()
-    for cluster in clusters:
-        logging.info(f"Accessing cluster: {cluster}")
-        service_arns = aws_conf.get_cluster_services(cluster)
-        for service_arn in service_arns:
-            service_desc = aws_conf.get_service_desc(service_arn, cluster)
-            service, is_fargate = aws_conf.is_fargate_service(service_desc)
-            if is_fargate:
-                logging.info(f"Service {service_arn} is Fargate, checking defended status")
-                task_definition, defender_status = aws_conf.get_fargate_defender_status(prisma_conf._latest_cwp_version, service["taskDefinition"])
-                if defender_status == "undefended":
-                    image = task_definition['containerDefinitions'][0]['name']
-                    logging.debug(f"Image: {image}")
-                    extract_entrypoint = not 'entryPoint' in task_definition['containerDefinitions'][0]
-                    if extract_entrypoint:
-                        if not prisma_conf.check_image_in_registry(task_definition):
-                            if not registry_credentialID and registry_type == "aws":
-                                registry_credentialID = image.split('.')[0]
-                        prisma_conf._fargate_params["extractEntrypoint"] = extract_entrypoint
-                        prisma_conf._fargate_params["registryCredentialID"] = registry_credentialID
-
-                    for attribute in prisma_conf._td_removed_attributes:
-                        del task_definition[attribute]
+    prisma_conf.set_updated_fargate_image_and_bundle(template_store=aws_conf)
 
-                    protected_task = prisma_conf.generate_protected_task(prisma_conf._fargate_params, json.dumps(task_definition, indent=4, sort_keys=True, default=str))
-                    logging.debug(f"protected_task: {protected_task}")
-                    for container in protected_task["containerDefinitions"]:
-                        if container["name"] == "TwistlockDefender" and container["logConfiguration"] == None:
-                            del container["logConfiguration"]
-                    new_task_definition_arn = aws_conf.register_task_definition(protected_task)
-                    aws_conf.update_service(cluster, service_arn, new_task_definition_arn)
-                elif defender_status == "outdated":
-                    for object in task_definition["containerDefinitions"][1]["environment"]:
-                        if object["name"] == "INSTALL_BUNDLE":
-                            object["value"] = prisma_conf._updated_fargate_bundle
-                    task_definition["containerDefinitions"][1]["image"] = prisma_conf._updated_fargate_image
-                    new_task_definition_arn = aws_conf.register_task_definition(task_definition)
-                    aws_conf.update_service(cluster, service_arn, new_task_definition_arn)
-                else:
-                    logging.info("Task definition is defended and defender is updated.")                    
-                break
-        break
+    # Sweep every cluster of every configured account and region concurrently and protect its Fargate services
+    sweep_state = None
+    if code_conf.sweep_state_path:
+        sweep_state = SweepState(
+            FileStateBackend(code_conf.sweep_state_path),
+            max_age=code_conf.sweep_state_max_age
+        )
+    sweeps = []
+    skipped_accounts = []
+    for account_id in aws_conf.get_sweep_accounts():
+        try:
+            account_conf = aws_conf.for_account(account_id)
+            # assume the sweep role now, so a bad role fails the account once
+            account_conf.check_credentials()
+            regions = account_conf.get_sweep_regions()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.info(f"Skipping account {account_id}: {e}")
+            skipped_accounts.append(account_failure(account_id, e))
+            continue
+        sweeps.extend(
+            Sweep(
+                account_conf.for_region(region),
+                prisma_conf,
+                max_workers=code_conf.sweep_max_workers,
+                state=sweep_state,
+                skip_non_fargate_clusters=code_conf.sweep_skip_non_fargate_clusters,
+                stage_workers=code_conf.sweep_stage_workers,
+                queue_size=code_conf.sweep_queue_size,
+                registry_type=code_conf.sweep_registry_type,
+                registry_credential_id=code_conf.sweep_registry_credential_id
+            )
+            for region in regions
+        )
+    report = skipped_accounts + run_sweeps(sweeps, max_workers=code_conf.sweep_max_regions)
+    logging.info("Sweep finished: %s", summarize_report(report))
+    # expired or rotated credentials must not outlive this invocation in cached sessions and clients
+    if any(result.get("errorCode") in CREDENTIAL_ERROR_CODES for result in report):
+        logging.info("AWS credentials rejected during the sweep, the runtime context will be rebuilt.")
+        reset_runtime_context()
+    logging.info("ECS mutations since the container started: %s", scheduler_module.mutation_metrics())
+    if IMPORT_PROFILE:
+        # modules the invocation imported lazily
+        IMPORT_PROFILER.log_report(limit=int(os.environ.get("IMPORT_PROFILE_LIMIT", "25")))
     ################################################################################
     # endregion get prisma secrets
     ################################################################################
@@ -0,0 +1,65 @@
+"""
+Tests for the in-memory LRU and disk layer of Cache.
+"""
+import os
+import tempfile
+import unittest
+from configurations.cache import Cache
+
+
+class CacheTest(unittest.TestCase):
+    """
+    Cached values are evicted least recently used first and survive on disk.
+    """
+
+    def test_lru_eviction(self):
+        cache = Cache("test", max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats, {"size": 2, "hits": 3, "misses": 1})
+
+    def test_values_are_isolated_copies(self):
+        cache = Cache("test")
+        value = {"containers": [{"name": "app"}]}
+        cache.put("task", value)
+        value["containers"].append({"name": "changed"})
+        cached = cache.get("task")
+        cached["containers"].clear()
+
+        self.assertEqual(cache.get("task"), {"containers": [{"name": "app"}]})
+
+    def test_disk_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            Cache("test", directory=directory).put("task", {"family": "web"})
+            cache = Cache("test", directory=directory)
+
+            self.assertEqual(cache.get("task"), {"family": "web"})
+            self.assertIsNone(Cache("other", directory=directory).get("task"))
+
+    def test_disk_layer_outlives_memory_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = Cache("test", max_size=1, directory=directory)
+            cache.put("a", 1)
+            cache.clear()
+
+            self.assertEqual(cache.get("a"), 1)
+            cache.discard("a")
+            self.assertIsNone(cache.get("a"))
+
+    def test_disk_layer_is_bounded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = Cache("test", max_size=2, directory=directory)
+            for key in ("a", "b", "c"):
+                cache.put(key, key)
+
+            self.assertEqual(len([name for name in os.listdir(cache.directory) if name.endswith(".json")]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""
+Tests for parsing the code configuration's environment variables.
+"""
+import unittest
+from configurations.code import parse_stage_workers
+
+
+class ParseStageWorkersTest(unittest.TestCase):
+    """
+    SWEEP_STAGE_WORKERS only accepts known stages with at least one worker.
+    """
+
+    def test_valid_value(self):
+        self.assertEqual(parse_stage_workers(" rollout=2, register = 3 ,"), {"rollout": 2, "register": 3})
+        self.assertEqual(parse_stage_workers(""), {})
+
+    def test_unknown_stage(self):
+        for value in ("deploy=2", "Rollout=2", "=2"):
+            with self.assertRaisesRegex(ValueError, "unknown stage"):
+                parse_stage_workers(value)
+
+    def test_non_positive_count(self):
+        for value in ("rollout=0", "rollout=-1"):
+            with self.assertRaisesRegex(ValueError, "at least 1 worker"):
+                parse_stage_workers(value)
+
+    def test_non_integer_count(self):
+        for value in ("rollout=two", "rollout", "rollout=1.5"):
+            with self.assertRaisesRegex(ValueError, "must be an integer"):
+                parse_stage_workers(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for classifying the defender of a Fargate task definition.
+"""
+import unittest
+from botocore.exceptions import ClientError
+from implementation_functions import aws_implementation_functions as aws_functions
+
+ARN = "arn:aws:ecs:us-east-1:123456789012:task-definition/web:3"
+VERSION_TAG = {"key": aws_functions.DEFENDER_VERSION_TAG, "value": "32_06_132"}
+
+
+class FakeECS():
+    """
+    ECS client answering describe_task_definition with one task definition.
+    """
+
+    def __init__(self, containers, tags=None):
+        self.task_definition = {"family": "web", "taskDefinitionArn": ARN, "containerDefinitions": containers}
+        self.tags = tags or []
+
+    def describe_task_definition(self, taskDefinition, include=None):
+        return {"taskDefinition": self.task_definition, "tags": self.tags}
+
+
+class DeniedTagsECS(FakeECS):
+    """
+    ECS client of a role without ecs:ListTagsForResource and ecs:TagResource.
+    """
+
+    def __init__(self, containers):
+        super().__init__(containers)
+        self.registered = []
+
+    def describe_task_definition(self, taskDefinition, include=None):
+        if include:
+            raise denied("DescribeTaskDefinition")
+
+        return {"taskDefinition": self.task_definition}
+
+    def register_task_definition(self, **task_definition):
+        if "tags" in task_definition:
+            raise denied("RegisterTaskDefinition")
+        self.registered.append(task_definition)
+
+        return {"taskDefinition": dict(task_definition, taskDefinitionArn=ARN)}
+
+
+def denied(operation):
+    return ClientError({"Error": {"Code": "AccessDeniedException", "Message": "denied"}}, operation)
+
+
+def app():
+    return {"name": "app", "image": "app:latest"}
+
+
+def defender(version):
+    return {"name": "TwistlockDefender", "image": f"registry/defender:{version}"}
+
+
+class DefenderStatusTest(unittest.TestCase):
+    """
+    Defender status from the defender container and the version tag.
+    """
+
+    def status(self, client, latest_version="32_06_132"):
+        return aws_functions.aws_ecs_get_fargate_defender_status(latest_version, ARN, client, debug_mode=False)[1]
+
+    def test_image_version(self):
+        self.assertEqual(self.status(FakeECS([app(), defender("32_06_132")])), "defended")
+        self.assertEqual(self.status(FakeECS([app(), defender("32_05_000")])), "outdated")
+        self.assertEqual(self.status(FakeECS([app()])), "undefended")
+
+    def test_tag_needs_the_defender_container(self):
+        self.assertEqual(self.status(FakeECS([app(), defender("latest_00")], tags=[VERSION_TAG])), "defended")
+        self.assertEqual(self.status(FakeECS([app()], tags=[VERSION_TAG])), "undefended")
+
+    def test_unknown_latest_version_is_never_defended(self):
+        self.assertEqual(self.status(FakeECS([app()]), latest_version=None), "undefended")
+        self.assertEqual(self.status(FakeECS([app(), defender("32_06_132")], tags=[VERSION_TAG]), latest_version=None), "outdated")
+
+    def test_denied_tags_fall_back_to_untagged_calls(self):
+        client = DeniedTagsECS([app(), defender("32_06_132")])
+
+        self.assertEqual(self.status(client), "defended")
+        arn = aws_functions.aws_ecs_register_task_definition(
+            {"family": "web", "containerDefinitions": [app()]}, client, debug_mode=False, tags={"a": "b"})
+        self.assertEqual(arn, ARN)
+        self.assertEqual(len(client.registered), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
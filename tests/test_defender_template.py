@@ -0,0 +1,58 @@
+"""
+Tests for setting the defender image and bundle from the defender template.
+"""
+import unittest
+from unittest import mock
+from configurations import prisma
+
+
+def defended_template(image, bundle):
+    return {
+        "family": "default",
+        "containerDefinitions": [
+            {"name": "app", "image": "app:latest", "entryPoint": ["/defender", "sh"]},
+            {"name": "TwistlockDefender", "image": image, "environment": [{"name": "INSTALL_BUNDLE", "value": bundle}]},
+        ],
+    }
+
+
+class DefenderTemplateTest(unittest.TestCase):
+    """
+    A failed template must not leave the previous run's defender in place.
+    """
+
+    def setUp(self):
+        self.prisma_conf = prisma.Prisma(local_run=True)
+        self.prisma_conf._local_task_rendering = False
+
+    def test_template_sets_image_and_bundle(self):
+        with mock.patch.object(self.prisma_conf, "get_defender_template", return_value=defended_template("defender:2", "bundle-2")):
+            self.prisma_conf.set_updated_fargate_image_and_bundle()
+
+        self.assertEqual(self.prisma_conf.updated_fargate_image, "defender:2")
+        self.assertEqual(self.prisma_conf.updated_fargate_bundle, "bundle-2")
+
+    def test_failed_template_clears_previous_defender(self):
+        with mock.patch.object(self.prisma_conf, "get_defender_template", return_value=defended_template("defender:1", "bundle-1")):
+            self.prisma_conf.set_updated_fargate_image_and_bundle()
+        with mock.patch.object(self.prisma_conf, "get_defender_template", return_value=None):
+            with self.assertRaises(RuntimeError):
+                self.prisma_conf.set_updated_fargate_image_and_bundle()
+
+        self.assertIsNone(self.prisma_conf.defender_template)
+        self.assertIsNone(self.prisma_conf.updated_fargate_image)
+        self.assertIsNone(self.prisma_conf.updated_fargate_bundle)
+        self.assertIsNone(self.prisma_conf.protected_task_renderer)
+
+    def test_template_without_defender_is_rejected(self):
+        template = defended_template("defender:1", "bundle-1")
+        template["containerDefinitions"].pop()
+        with mock.patch.object(self.prisma_conf, "get_defender_template", return_value=template):
+            with self.assertRaises(RuntimeError):
+                self.prisma_conf.set_updated_fargate_image_and_bundle()
+
+        self.assertIsNone(self.prisma_conf.updated_fargate_image)
+
+
+if __name__ == "__main__":
+    unittest.main()
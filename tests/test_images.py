@@ -0,0 +1,58 @@
+"""
+Tests for matching task definition images against registry scan results.
+"""
+import unittest
+from implementation_functions.prisma_implementation_functions import prisma_normalize_image, prisma_registry_image_keys
+
+
+class NormalizeImageTest(unittest.TestCase):
+    """
+    References to the same image normalize to the same key.
+    """
+
+    def test_docker_hub(self):
+        for image in ("nginx", "nginx:latest", "library/nginx", "docker.io/nginx", "docker.io/library/nginx:latest", "index.docker.io/library/nginx"):
+            self.assertEqual(prisma_normalize_image(image), "docker.io/library/nginx:latest", image)
+
+    def test_docker_hub_namespace(self):
+        self.assertEqual(prisma_normalize_image("bitnami/redis:7.2"), "docker.io/bitnami/redis:7.2")
+
+    def test_private_registry(self):
+        self.assertEqual(
+            prisma_normalize_image("123456789012.dkr.ecr.us-east-1.amazonaws.com/team/api:1.4"),
+            "123456789012.dkr.ecr.us-east-1.amazonaws.com/team/api:1.4")
+        self.assertEqual(prisma_normalize_image("localhost/api"), "localhost/api:latest")
+
+    def test_registry_port_is_not_a_tag(self):
+        self.assertEqual(prisma_normalize_image("registry:5000/api"), "registry:5000/api:latest")
+        self.assertEqual(prisma_normalize_image("registry:5000/api:2"), "registry:5000/api:2")
+
+    def test_digest_is_dropped(self):
+        digest = "@sha256:" + "a" * 64
+        self.assertEqual(prisma_normalize_image("nginx:1.25" + digest), "docker.io/library/nginx:1.25")
+        self.assertEqual(prisma_normalize_image("nginx" + digest), "docker.io/library/nginx:latest")
+
+
+class RegistryImageKeysTest(unittest.TestCase):
+    """
+    Every tag of a scan result is indexed.
+    """
+
+    def test_repo_tag_and_tags(self):
+        entry = {
+            "repoTag": {"registry": "123456789012.dkr.ecr.us-east-1.amazonaws.com", "repo": "api", "tag": "1.4"},
+            "tags": [{"registry": "123456789012.dkr.ecr.us-east-1.amazonaws.com", "repo": "api", "tag": ""}, {"repo": "nginx", "tag": "1.25"}],
+        }
+
+        self.assertEqual(prisma_registry_image_keys(entry), [
+            "123456789012.dkr.ecr.us-east-1.amazonaws.com/api:1.4",
+            "123456789012.dkr.ecr.us-east-1.amazonaws.com/api:latest",
+            "docker.io/library/nginx:1.25",
+        ])
+
+    def test_entry_without_repo(self):
+        self.assertEqual(prisma_registry_image_keys({"repoTag": {"registry": "docker.io"}}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+Tests for rendering protected task definitions locally from the defender template.
+"""
+import copy
+import json
+import unittest
+from unittest import mock
+from configurations.renderer import ProtectedTaskRenderer, learn_patch, apply_patch
+from configurations.sweep import Sweep
+
+DEFENDER_ENTRYPOINT = ["/var/lib/twistlock/fargate/fargate_defender.sh", "fargate", "entrypoint"]
+
+
+def load_default_task_definition():
+    with open("configurations/default_taskdef.json", "r") as file:
+        return json.load(file)
+
+
+def prisma_defend(task_definition):
+    """
+    Defend a task definition the way Prisma's fargate/taskDefinition API does.
+    """
+    defended = copy.deepcopy(task_definition)
+    defended["pidMode"] = "task"
+    for container in defended["containerDefinitions"]:
+        # Prisma extracts the entrypoint from the image when the task has none
+        container["entryPoint"] = DEFENDER_ENTRYPOINT + container.get("entryPoint", ["/docker-entrypoint.sh"])
+        container["environment"] = container.get("environment", []) + [
+            {"name": "TW_IMAGE_NAME", "value": container["image"]},
+            {"name": "TW_CONTAINER_NAME", "value": container["name"]},
+            {"name": "TW_EXTRACT_ENTRYPOINT", "value": "false"},
+        ]
+        container["volumesFrom"] = container.get("volumesFrom", []) + [{"readOnly": False, "sourceContainer": "TwistlockDefender"}]
+        container["dependsOn"] = [{"containerName": "TwistlockDefender", "condition": "START"}]
+        container["linuxParameters"] = {"capabilities": {"add": ["SYS_PTRACE"]}}
+    defended["containerDefinitions"].append({
+        "name": "TwistlockDefender",
+        "image": "registry-auth.twistlock.com/tw_token/twistlock/defender:defender_32_06_132",
+        "entryPoint": ["/usr/local/bin/defender", "fargate", "sidecar"],
+        "environment": [
+            {"name": "INSTALL_BUNDLE", "value": "bundle"},
+            {"name": "FARGATE_TASK", "value": task_definition["family"]},
+            {"name": "WS_ADDRESS", "value": "wss://console:443"},
+        ],
+        "essential": True,
+        "logConfiguration": None,
+    })
+
+    return defended
+
+
+def task(family, *containers):
+    return {
+        "family": family,
+        "networkMode": "awsvpc",
+        "cpu": "512",
+        "memory": "1024",
+        "requiresCompatibilities": ["FARGATE"],
+        "containerDefinitions": [
+            {"name": name, "image": image, "essential": True, "entryPoint": ["sh", "-c"], "command": ["run"], "environment": [], "volumesFrom": []}
+            for name, image in containers
+        ],
+    }
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True)
+
+
+class PatchTest(unittest.TestCase):
+    """
+    Additions learned from one dict are applied to another.
+    """
+
+    def test_patch_reproduces_additions(self):
+        source = {"a": 1, "drop": True, "items": [1], "nested": {"x": 1}}
+        defended = {"a": 1, "new": "v", "items": [1, 2], "nested": {"x": 1, "y": 2}}
+        patch = learn_patch(source, defended, "task")
+        target = copy.deepcopy(source)
+        apply_patch(target, patch, "task")
+
+        self.assertEqual(target, defended)
+
+    def test_changed_value_is_not_learned(self):
+        with self.assertRaises(ValueError):
+            learn_patch({"cpu": "256"}, {"cpu": "512"}, "task")
+
+    def test_conflicting_addition_is_rejected(self):
+        patch = learn_patch({}, {"pidMode": "task"}, "task")
+        with self.assertRaises(ValueError):
+            apply_patch({"pidMode": "host"}, patch, "task")
+
+
+class ProtectedTaskRendererTest(unittest.TestCase):
+    """
+    The renderer must produce what Prisma would for the same task definition.
+    """
+
+    def setUp(self):
+        self.source = load_default_task_definition()
+        self.renderer = ProtectedTaskRenderer(self.source, prisma_defend(self.source))
+
+    def test_template_is_reproduced(self):
+        self.assertTrue(self.renderer.ready)
+        self.assertEqual(self.renderer.sidecar_names, ["TwistlockDefender"])
+        self.assertEqual(canonical(self.renderer.render(copy.deepcopy(self.source))), canonical(prisma_defend(self.source)))
+
+    def test_image_name_and_family_are_substituted(self):
+        task_definition = task("payments", ("api", "123456789012.dkr.ecr.us-east-1.amazonaws.com/api:1.2"))
+        rendered = self.renderer.render(copy.deepcopy(task_definition))
+
+        self.assertEqual(canonical(rendered), canonical(prisma_defend(task_definition)))
+        sidecar = rendered["containerDefinitions"][-1]
+        self.assertIn({"name": "FARGATE_TASK", "value": "payments"}, sidecar["environment"])
+        self.assertNotIn(self.source["family"], json.dumps(rendered))
+        self.assertNotIn(self.source["containerDefinitions"][0]["image"], json.dumps(rendered))
+
+    def test_every_container_is_wrapped(self):
+        task_definition = task("shop", ("web", "nginx:1.25"), ("worker", "python:3.11"), ("proxy", "envoy:1.29"))
+        rendered = self.renderer.render(copy.deepcopy(task_definition))
+
+        self.assertEqual(canonical(rendered), canonical(prisma_defend(task_definition)))
+        self.assertEqual([container["name"] for container in rendered["containerDefinitions"]], ["web", "worker", "proxy", "TwistlockDefender"])
+
+    def test_missing_entrypoint_is_not_rendered(self):
+        task_definition = task("shop", ("web", "nginx:1.25"))
+        del task_definition["containerDefinitions"][0]["entryPoint"]
+
+        self.assertIsNone(self.renderer.render(task_definition))
+
+    def test_defended_task_is_not_rendered_again(self):
+        task_definition = prisma_defend(task("shop", ("web", "nginx:1.25")))
+
+        self.assertIsNone(self.renderer.render(task_definition))
+
+    def test_unlearnable_template_disables_rendering(self):
+        defended = prisma_defend(self.source)
+        defended["cpu"] = "1024"
+        disabled = ProtectedTaskRenderer(self.source, defended)
+
+        self.assertFalse(disabled.ready)
+        self.assertIsNone(disabled.render(task("shop", ("web", "nginx:1.25"))))
+
+    def test_template_mentioning_its_own_container_disables_rendering(self):
+        defended = prisma_defend(self.source)
+        defended["containerDefinitions"][-1]["environment"].append({"name": "APP", "value": "run fargate-app now"})
+
+        self.assertFalse(ProtectedTaskRenderer(self.source, defended).ready)
+
+
+class PrismaFallbackTest(unittest.TestCase):
+    """
+    The sweep asks Prisma whenever the renderer cannot be used.
+    """
+
+    def sweep(self, template_renderer):
+        prisma_conf = mock.Mock()
+        prisma_conf.fargate_params = {"consoleaddr": "console"}
+        prisma_conf._td_removed_attributes = ["taskDefinitionArn", "revision"]
+        prisma_conf.protected_task_renderer = template_renderer
+        prisma_conf.check_image_in_registry.return_value = True
+        prisma_conf.generate_protected_task.side_effect = lambda params, task_definition: prisma_defend(json.loads(task_definition))
+
+        return Sweep(mock.Mock(), prisma_conf), prisma_conf
+
+    def setUp(self):
+        self.source = load_default_task_definition()
+
+    def test_ready_renderer_skips_prisma(self):
+        sweep, prisma_conf = self.sweep(ProtectedTaskRenderer(self.source, prisma_defend(self.source)))
+        protected = sweep.generate_protected_task(task("shop", ("web", "nginx:1.25")))
+
+        prisma_conf.generate_protected_task.assert_not_called()
+        self.assertNotIn("logConfiguration", protected["containerDefinitions"][-1])
+
+    def test_missing_entrypoint_asks_prisma(self):
+        sweep, prisma_conf = self.sweep(ProtectedTaskRenderer(self.source, prisma_defend(self.source)))
+        task_definition = task("shop", ("web", "nginx:1.25"))
+        del task_definition["containerDefinitions"][0]["entryPoint"]
+        protected = sweep.generate_protected_task(task_definition)
+
+        params = prisma_conf.generate_protected_task.call_args[0][0]
+        self.assertTrue(params["extractEntrypoint"])
+        self.assertEqual(protected["containerDefinitions"][0]["entryPoint"], DEFENDER_ENTRYPOINT + ["/docker-entrypoint.sh"])
+
+    def test_renderer_failure_asks_prisma(self):
+        defended = prisma_defend(self.source)
+        defended["cpu"] = "1024"
+        sweep, prisma_conf = self.sweep(ProtectedTaskRenderer(self.source, defended))
+        task_definition = task("shop", ("web", "nginx:1.25"))
+        protected = sweep.generate_protected_task(copy.deepcopy(task_definition))
+
+        prisma_conf.generate_protected_task.assert_called_once()
+        self.assertEqual(protected["containerDefinitions"][0]["entryPoint"], DEFENDER_ENTRYPOINT + ["sh", "-c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
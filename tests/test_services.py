@@ -0,0 +1,37 @@
+"""
+Tests for listing the services of a cluster that may run on Fargate.
+"""
+import unittest
+from unittest import mock
+from configurations import aws
+
+
+class ClusterFargateServicesTest(unittest.TestCase):
+    """
+    Each cluster is listed once.
+    """
+
+    def setUp(self):
+        self.aws_conf = mock.Mock(ecs_client="ecs", debug_mode=False)
+
+    def list_services(self, capacity_provider_pass):
+        with mock.patch.object(aws, "aws_ecs_get_services", return_value=["svc"]) as get_services:
+            services = aws.AWS.get_cluster_fargate_services(self.aws_conf, "cluster", capacity_provider_pass=capacity_provider_pass)
+
+        self.assertEqual(services, ["svc"])
+
+        return get_services
+
+    def test_capacity_provider_cluster_is_listed_unfiltered(self):
+        get_services = self.list_services(True)
+
+        get_services.assert_called_once_with("cluster", client="ecs", debug_mode=False)
+
+    def test_other_cluster_is_listed_with_the_fargate_filter(self):
+        get_services = self.list_services(False)
+
+        get_services.assert_called_once_with("cluster", client="ecs", debug_mode=False, launch_type="FARGATE")
+
+
+if __name__ == "__main__":
+    unittest.main()
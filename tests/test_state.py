@@ -0,0 +1,88 @@
+"""
+Tests for skipping unchanged services with the persisted sweep state.
+"""
+import os
+import time
+import tempfile
+import unittest
+from configurations.state import SweepState, FileStateBackend
+
+CLUSTER = "arn:aws:ecs:us-east-1:123456789012:cluster/main"
+SERVICE = f"{CLUSTER}/web"
+TASK_DEFINITION = "arn:aws:ecs:us-east-1:123456789012:task-definition/web:4"
+
+
+class MemoryBackend():
+    """
+    State backend kept in memory.
+    """
+
+    def __init__(self, state=None):
+        self.state = state or {}
+
+    def load(self):
+        return dict(self.state)
+
+    def save(self, state):
+        self.state = state
+
+
+def service(task_definition=TASK_DEFINITION, deployments=None):
+    return {
+        "serviceArn": SERVICE,
+        "taskDefinition": task_definition,
+        "deployments": deployments if deployments is not None else [{"taskDefinition": task_definition}],
+    }
+
+
+class SweepStateTest(unittest.TestCase):
+    """
+    A service is current only while nothing about it changed.
+    """
+
+    def setUp(self):
+        self.state = SweepState(MemoryBackend(), max_age=3600)
+        self.state.record(CLUSTER, SERVICE, TASK_DEFINITION, "32_06_132")
+
+    def test_unchanged_service_is_current(self):
+        self.assertTrue(self.state.is_current(service(), "32_06_132"))
+
+    def test_task_definition_mismatch(self):
+        self.assertFalse(self.state.is_current(service("arn:aws:ecs:us-east-1:123456789012:task-definition/web:5"), "32_06_132"))
+
+    def test_version_mismatch(self):
+        self.assertFalse(self.state.is_current(service(), "32_07_000"))
+        self.assertFalse(self.state.is_current(service(), None))
+
+    def test_max_age(self):
+        self.state.entries[SERVICE]["lastChecked"] = time.time() - 3601
+
+        self.assertFalse(self.state.is_current(service(), "32_06_132"))
+
+    def test_deployment_in_flight(self):
+        deployments = [{"taskDefinition": TASK_DEFINITION}, {"taskDefinition": "arn:aws:ecs:us-east-1:123456789012:task-definition/web:3"}]
+
+        self.assertFalse(self.state.is_current(service(deployments=deployments), "32_06_132"))
+
+    def test_unknown_service(self):
+        self.assertFalse(SweepState(MemoryBackend()).is_current(service(), "32_06_132"))
+
+    def test_prune_keeps_other_clusters(self):
+        self.state.record("other", "other/api", TASK_DEFINITION, "32_06_132")
+        self.state.prune(CLUSTER, [])
+
+        self.assertEqual(list(self.state.entries), ["other/api"])
+
+    def test_file_backend_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = FileStateBackend(os.path.join(directory, "state", "sweep.json"))
+            self.assertEqual(backend.load(), {})
+            state = SweepState(backend)
+            state.record(CLUSTER, SERVICE, TASK_DEFINITION, "32_06_132")
+            state.save()
+
+            self.assertTrue(SweepState(backend).is_current(service(), "32_06_132"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,295 @@
+"""
+Tests for the sweep pipeline.
+"""
+import copy
+import queue
+import threading
+import unittest
+from unittest import mock
+from botocore.exceptions import ClientError
+from configurations.sweep import ECS_STAGES, Stage, Sweep, account_failure, protection_hash, resolve_stage_workers
+
+VERSION = "32_06_132"
+
+
+def task_definition_arn(family, revision):
+    return f"arn:aws:ecs:us-east-1:123456789012:task-definition/{family}:{revision}"
+
+
+class FakeAWS():
+    """
+    AWS configuration with one cluster whose services run the given task definitions.
+    """
+
+    account_id = None
+    aws_region = "us-east-1"
+
+    def __init__(self, service_task_definitions, revisions=(), revision_hashes=None, register=None):
+        self.cluster = "arn:aws:ecs:us-east-1:123456789012:cluster/main"
+        self.services = {f"{self.cluster}/svc-{index}": arn for index, arn in enumerate(service_task_definitions)}
+        self.revisions = list(revisions)
+        self.revision_hashes = revision_hashes or {}
+        self.register = register or (lambda task_definition: task_definition_arn(task_definition["family"], 99))
+        self.lock = threading.Lock()
+        self.registered = []
+        self.updated = []
+        self.tag_reads = []
+
+    def get_ecs_clusters(self):
+        return [self.cluster]
+
+    def describe_ecs_clusters(self, cluster_arns):
+        return {"clusters": {arn: {"status": "ACTIVE", "activeServicesCount": len(self.services), "capacityProviders": ["FARGATE"]} for arn in cluster_arns}}
+
+    def get_cluster_fargate_services(self, cluster, capacity_provider_pass=True):
+        return list(self.services)
+
+    def get_service_descs(self, service_arns, cluster):
+        return {"services": {arn: {"serviceArn": arn, "taskDefinition": self.services[arn]} for arn in service_arns}, "failures": {}}
+
+    def is_fargate_service(self, service_descs):
+        return service_descs["services"][0], True
+
+    def get_fargate_defender_status(self, latest_version, task_definition_arn):
+        family = task_definition_arn.rsplit("/", 1)[1].split(":")[0]
+        task_definition = {
+            "family": family,
+            "taskDefinitionArn": task_definition_arn,
+            "revision": int(task_definition_arn.rsplit(":", 1)[1]),
+            "containerDefinitions": [{"name": "app", "image": "app:1", "entryPoint": ["sh"]}],
+        }
+
+        return task_definition, "undefended"
+
+    def list_task_definition_revisions(self, family):
+        return [arn for arn in self.revisions if f"/{family}:" in arn]
+
+    def get_revision_source_hash(self, revision_arn):
+        with self.lock:
+            self.tag_reads.append(revision_arn)
+
+        return self.revision_hashes.get(revision_arn)
+
+    def register_task_definition(self, task_definition, source_hash=None, defender_version=None):
+        with self.lock:
+            self.registered.append(source_hash)
+
+        return self.register(task_definition)
+
+    def update_service(self, cluster, service_arn, new_task_definition_arn):
+        with self.lock:
+            self.updated.append((service_arn, new_task_definition_arn))
+
+        return {"service": {}}
+
+
+class FakePrisma():
+    """
+    Prisma configuration that defends a task definition by adding the sidecar.
+    """
+
+    latest_cwp_version = VERSION
+    _td_removed_attributes = ["taskDefinitionArn", "revision"]
+
+    def __init__(self):
+        self.generated = 0
+
+    def generate_protected_task(self, task_definition):
+        self.generated += 1
+        protected = copy.deepcopy(task_definition)
+        protected["containerDefinitions"].append({"name": "TwistlockDefender", "image": f"defender:{VERSION}"})
+
+        return protected
+
+
+def run_sweep(aws_conf, prisma_conf=None, timeout=10):
+    """
+    Run a sweep in a thread and fail the test if it hangs.
+    """
+    sweep = Sweep(aws_conf, prisma_conf or FakePrisma(), max_workers=4)
+    sweep.generate_protected_task = sweep._prisma_conf.generate_protected_task
+    thread = threading.Thread(target=sweep.run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise AssertionError("sweep did not finish")
+
+    return sweep
+
+
+def source_hash(family):
+    task_definition, _ = FakeAWS([]).get_fargate_defender_status(VERSION, task_definition_arn(family, 1))
+    for attribute in FakePrisma._td_removed_attributes:
+        task_definition.pop(attribute)
+
+    return protection_hash(task_definition, VERSION)
+
+
+class StageTest(unittest.TestCase):
+    """
+    Items flow through the stage's workers to the next stage.
+    """
+
+    def test_outputs_and_failures(self):
+        downstream = queue.Queue()
+        errors = []
+
+        def handler(item):
+            if item == 3:
+                raise ValueError("bad item")
+            yield item * 10
+
+        stage = Stage("double", handler, workers=3, queue_size=2, downstream=downstream, on_error=lambda item, e: errors.append(item))
+        stage.start()
+        for item in range(6):
+            stage.put(item)
+        stage.close()
+
+        self.assertEqual(sorted(downstream.queue), [0, 10, 20, 40, 50])
+        self.assertEqual(errors, [3])
+        self.assertEqual(stage.stats["processed"], 6)
+        self.assertEqual(stage.stats["failed"], 1)
+
+    def test_partition_is_handled_in_order(self):
+        downstream = queue.Queue()
+        stage = Stage("ordered", lambda item: [item], workers=4, downstream=downstream, partition_key=lambda item: item[0])
+        stage.start()
+        for index in range(50):
+            stage.put(("a" if index % 2 else "b", index))
+        stage.close()
+
+        for key in ("a", "b"):
+            indexes = [index for item_key, index in downstream.queue if item_key == key]
+            self.assertEqual(indexes, sorted(indexes))
+
+    def test_closing_in_order_drains_the_pipeline(self):
+        results = queue.Queue()
+        last = Stage("last", lambda item: [item + 1], workers=2, queue_size=1, downstream=results)
+        first = Stage("first", lambda item: [item * 2, item * 2], workers=3, queue_size=1, downstream=last)
+        for stage in (first, last):
+            stage.start()
+        for item in range(20):
+            first.put(item)
+        for stage in (first, last):
+            stage.close()
+
+        self.assertEqual(sorted(results.queue), sorted([item * 2 + 1 for item in range(20)] * 2))
+
+
+class StageWorkersTest(unittest.TestCase):
+    """
+    The sweep and the ECS connection pool use the same workers per stage.
+    """
+
+    def test_defaults_and_overrides(self):
+        self.assertEqual(resolve_stage_workers(8), {"discover": 8, "classify": 8, "protect": 8, "register": 4, "rollout": 4})
+        self.assertEqual(resolve_stage_workers(1)["rollout"], 1)
+        self.assertEqual(resolve_stage_workers(8, {"discover": 32})["discover"], 32)
+
+    def test_sweep_uses_resolved_workers(self):
+        sweep = Sweep(FakeAWS([]), FakePrisma(), max_workers=6, stage_workers={"rollout": 10})
+
+        self.assertEqual(sweep.stage_workers, resolve_stage_workers(6, {"rollout": 10}))
+        self.assertEqual(sum(sweep.stage_workers[stage] for stage in ECS_STAGES), 6 + 6 + 3 + 10)
+
+
+class SharedRegistrationTest(unittest.TestCase):
+    """
+    Services with the same source task definition share one registration.
+    """
+
+    def test_one_register_for_shared_task_definition(self):
+        aws_conf = FakeAWS([task_definition_arn("web", 1)] * 12)
+        sweep = run_sweep(aws_conf)
+
+        self.assertEqual(len(aws_conf.registered), 1)
+        self.assertEqual(len(aws_conf.updated), 12)
+        self.assertEqual(sweep.summary(), {"protected": 12})
+
+    def test_same_content_in_two_revisions_registers_once(self):
+        aws_conf = FakeAWS([task_definition_arn("web", 1), task_definition_arn("web", 2)] * 3)
+        run_sweep(aws_conf)
+
+        self.assertEqual(len(aws_conf.registered), 1)
+        self.assertEqual(len(aws_conf.updated), 6)
+
+    def test_failed_register_fails_every_follower(self):
+        def register(task_definition):
+            raise RuntimeError("register failed")
+
+        aws_conf = FakeAWS([task_definition_arn("web", 1)] * 8, register=register)
+        sweep = run_sweep(aws_conf)
+
+        self.assertEqual(len(aws_conf.registered), 1)
+        self.assertEqual(aws_conf.updated, [])
+        self.assertEqual(sweep.summary(), {"failed": 8})
+
+    def test_unregistered_revision_fails_every_follower(self):
+        aws_conf = FakeAWS([task_definition_arn("web", 1)] * 5, register=lambda task_definition: None)
+        sweep = run_sweep(aws_conf)
+
+        self.assertEqual(aws_conf.updated, [])
+        self.assertEqual(sweep.summary(), {"failed": 5})
+
+
+class ProtectedRevisionTest(unittest.TestCase):
+    """
+    Revisions an earlier run registered are found by their source hash tag.
+    """
+
+    def test_tagged_revision_is_reused(self):
+        reused = task_definition_arn("web", 7)
+        aws_conf = FakeAWS(
+            [task_definition_arn("web", 1)] * 3,
+            revisions=[task_definition_arn("web", 8), reused, task_definition_arn("web", 1)],
+            revision_hashes={reused: source_hash("web")},
+        )
+        sweep = run_sweep(aws_conf)
+
+        self.assertEqual(aws_conf.registered, [])
+        self.assertEqual({arn for _, arn in aws_conf.updated}, {reused})
+        self.assertEqual(aws_conf.tag_reads, [task_definition_arn("web", 8), reused])
+        self.assertEqual(sweep.summary(), {"protected": 3})
+
+    def test_walk_stops_at_the_source_revision(self):
+        older = task_definition_arn("web", 2)
+        aws_conf = FakeAWS(
+            [task_definition_arn("web", 3)],
+            revisions=[task_definition_arn("web", 5), task_definition_arn("web", 4), task_definition_arn("web", 3), older],
+            revision_hashes={older: source_hash("web")},
+        )
+        run_sweep(aws_conf)
+
+        self.assertEqual(aws_conf.tag_reads, [task_definition_arn("web", 5), task_definition_arn("web", 4)])
+        self.assertEqual(len(aws_conf.registered), 1)
+
+
+class ErrorReportTest(unittest.TestCase):
+    """
+    Failures carry the AWS error code, so rejected credentials can be detected.
+    """
+
+    def expired(self, operation):
+        return ClientError({"Error": {"Code": "ExpiredTokenException", "Message": "expired"}}, operation)
+
+    def test_target_failure(self):
+        aws_conf = FakeAWS([])
+        aws_conf.get_ecs_clusters = mock.Mock(side_effect=self.expired("ListClusters"))
+        sweep = run_sweep(aws_conf)
+
+        self.assertEqual(sweep.report[0]["errorCode"], "ExpiredTokenException")
+
+    def test_stage_failure(self):
+        aws_conf = FakeAWS([task_definition_arn("web", 1)])
+        aws_conf.get_cluster_fargate_services = mock.Mock(side_effect=self.expired("ListServices"))
+        sweep = run_sweep(aws_conf)
+
+        self.assertEqual([result["errorCode"] for result in sweep.report], ["ExpiredTokenException"])
+
+    def test_account_failure(self):
+        self.assertEqual(account_failure("123456789012", self.expired("AssumeRole"))["errorCode"], "ExpiredTokenException")
+        self.assertNotIn("errorCode", account_failure("123456789012", RuntimeError("no regions")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for sharing Prisma token refreshes between threads.
+"""
+import time
+import threading
+import unittest
+from unittest import mock
+from configurations import prisma
+from configurations.tokens import TOKEN_MANAGER
+
+
+class RejectedTokenTest(unittest.TestCase):
+    """
+    Requests refused with the same token must share a single login.
+    """
+
+    def setUp(self):
+        self.prisma_conf = prisma.Prisma(local_run=True)
+        self.prisma_conf.prisma_access_key = f"test-{id(self)}"
+        self.prisma_conf.prisma_secret_key = "secret"
+        self.logins = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        TOKEN_MANAGER.invalidate(self.prisma_conf.token_key("cwp"))
+
+    def login(self, **kwargs):
+        with self.lock:
+            self.logins.append(kwargs)
+            token = f"token-{len(self.logins)}"
+        # keep the login open so the other thread's 401 arrives while it runs
+        time.sleep(0.1)
+
+        return {"token": token}, 200
+
+    def test_concurrent_401s_share_one_login(self):
+        requests = []
+        barrier = threading.Barrier(2)
+
+        def get_latest_version(token, **kwargs):
+            with self.lock:
+                requests.append(token)
+                first = requests.count("token-1") == 1
+            if token == "token-1":
+                # both requests are sent with the first token
+                barrier.wait(timeout=5)
+                if not first:
+                    # the second 401 arrives after the other thread refreshed
+                    deadline = time.time() + 5
+                    while self.prisma_conf._cwp_token != "token-2" and time.time() < deadline:
+                        time.sleep(0.01)
+
+                return "expired", 401
+
+            return "32_06_132", 200
+
+        with mock.patch.object(prisma, "prisma_cwp_login", side_effect=self.login), \
+                mock.patch.object(prisma, "prisma_get_latest_version", side_effect=get_latest_version):
+            self.prisma_conf.get_cwp_token()
+            threads = [threading.Thread(target=self.prisma_conf.get_latest_version) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        self.assertEqual(len(self.logins), 2)
+        self.assertEqual(requests.count("token-1"), 2)
+        self.assertEqual(requests.count("token-2"), 2)
+        self.assertEqual(self.prisma_conf.latest_cwp_version, "32_06_132")
+
+    def test_refreshed_token_is_not_rejected_again(self):
+        with mock.patch.object(prisma, "prisma_cwp_login", side_effect=self.login):
+            self.prisma_conf.get_cwp_token()
+            self.prisma_conf.get_cwp_token(rejected="token-1")
+            # a late 401 for the first token must keep the refreshed one
+            self.prisma_conf.get_cwp_token(rejected="token-1")
+
+        self.assertEqual(len(self.logins), 2)
+        self.assertEqual(self.prisma_conf.cwp_token, "token-2")
+
+
+if __name__ == "__main__":
+    unittest.main()